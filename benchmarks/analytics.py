@@ -0,0 +1,109 @@
+"""
+Compare heatmaps computed by the database with the columnar snapshot of
+citation.analytics.
+
+    python benchmarks/seed.py --citations 1000000
+    python benchmarks/analytics.py
+
+The ORM path is a GROUP BY over citation_citation per agency, the snapshot
+path masks and bincounts the memory-mapped arrays. Both compute the
+hour-of-week x county heatmap of every agency and the command fails if
+their counts differ. Also reported: the time to build the snapshot from
+scratch and to refresh it after a batch of changed citations.
+"""
+from collections import Counter
+from pathlib import Path
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ['DJANGO_SETTINGS_MODULE'] = 'benchmarks.settings'
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db.models import Count  # noqa: E402
+from django.db.models.functions import ExtractHour  # noqa: E402
+from django.db.models.functions import ExtractIsoWeekDay  # noqa: E402
+
+from citation import analytics, sync  # noqa: E402
+from citation.models import Citation  # noqa: E402
+from user.models import User  # noqa: E402
+
+
+def orm_heatmap(agency):
+    rows = (
+        Citation.objects
+        .filter(citation_agency=agency)
+        .values_list(
+            ExtractIsoWeekDay('violation_datetime'),
+            ExtractHour('violation_datetime'),
+            'violation_county')
+        .annotate(Count('id'))
+        .order_by()
+    )
+    return Counter({
+        (f'{analytics.WEEKDAYS[day - 1]} {hour:02d}:00', county): n
+        for day, hour, county, n in rows
+    })
+
+
+def snapshot_heatmap(agency):
+    snapshot = analytics.current()
+    rows = analytics.select(snapshot, agency)
+    heatmap = analytics.heatmap(
+        snapshot, rows, analytics.Dimension.HOUR_OF_WEEK,
+        analytics.Dimension.COUNTY)
+    return Counter({
+        (row, column): n
+        for row, counts in zip(heatmap['row_labels'], heatmap['counts'])
+        for column, n in zip(heatmap['column_labels'], counts)
+        if n
+    })
+
+
+PATHS = {'orm': orm_heatmap, 'snapshot': snapshot_heatmap}
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--changed', type=int, default=100)
+    args = parser.parse_args()
+
+    snapshot, build_ms = timed(analytics.refresh, True)
+    print(f'full build  {len(snapshot)} citations in {build_ms:8.1f}ms')
+
+    agencies = User.Agency.values
+    results = {}
+    for name, heatmap in PATHS.items():
+        samples = []
+        for _ in range(args.repeat):
+            results[name], ms = timed(
+                lambda: [heatmap(agency) for agency in agencies])
+            samples.append(ms)
+        print(f'{name:<9} {len(agencies)} heatmaps in {min(samples):8.1f}ms')
+    if results['snapshot'] != results['orm']:
+        sys.exit('snapshot heatmap differs from the ORM one')
+
+    # Move the latest citations to the head of the change feed, as an
+    # update would, and pick them up incrementally
+    changed = list(Citation.objects.order_by('-id')[:args.changed])
+    sync.stamp(changed)
+    Citation.objects.bulk_update(changed, ['change_seq'])
+    snapshot, refresh_ms = timed(analytics.refresh)
+    print(f'refresh     {len(changed)} changed citations in '
+          f'{refresh_ms:8.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Concurrent read/write throughput of the SQLite profiles.
+
+    python benchmarks/seed.py --citations 100000
+    python benchmarks/concurrency.py --workers 8 --seconds 10
+
+Each profile of settings.SQLITE_PROFILES is run against the benchmark
+database by a pool of worker processes, like WSGI workers, each with its
+own test client and database connection. They mix citation submissions
+with agency list reads through the full handler, including connection
+setup and teardown. Reported per profile: reads and writes per second,
+p95 latency and requests that failed, usually with "database is locked".
+"""
+from pathlib import Path
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import time
+
+BENCH_DIR = Path(__file__).resolve().parent
+PASSWORD = 'Benchmark!Pass1'
+AGENCY = 'albany'
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def setup():
+    sys.path.insert(0, str(BENCH_DIR.parent))
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'benchmarks.settings'
+
+    import django
+
+    django.setup()
+
+
+def login(email):
+    from django.test import Client
+
+    response = Client().post(
+        '/api/login',
+        json.dumps({'email': email, 'password': PASSWORD}),
+        content_type='application/json')
+    return {'HTTP_AUTHORIZATION': f"Bearer {response.json()['access_token']}"}
+
+
+def worker(job):
+    """One client process: mixed requests until the deadline."""
+    from django.db import connection
+    from django.test import Client
+
+    n, deadline, writes, body, clerk, officer = job
+    client = Client(raise_request_exception=False)
+    rng = random.Random(n)
+    latencies = {'read': [], 'write': []}
+    errors = 0
+
+    while time.time() < deadline:
+        kind = 'write' if rng.random() < writes else 'read'
+        began = time.perf_counter()
+        if kind == 'write':
+            response = client.post(
+                '/api/citation/', body,
+                content_type='application/json', **officer)
+        else:
+            response = client.get('/api/list_citations/?limit=50', **clerk)
+        if response.status_code == 200:
+            latencies[kind].append(time.perf_counter() - began)
+        else:
+            errors += 1
+
+    connection.close()
+    return latencies, errors
+
+
+def run_profile(args):
+    """Run the workload from this process, for the profile in the env."""
+    setup()
+    from django.db import connection
+
+    citation = json.loads((BENCH_DIR / 'citation.json').read_text())
+    citation['citation_agency'] = AGENCY
+    body = json.dumps(citation)
+
+    clerk = login(f'clerk.{AGENCY}@example.com')
+    officers = [login(f'officer{n}.{AGENCY}@example.com') for n in range(10)]
+    # Children must open their own connections
+    connection.close()
+
+    deadline = time.time() + 1 + args.seconds
+    jobs = [
+        (n, deadline, args.writes, body, clerk, officers[n % len(officers)])
+        for n in range(args.workers)
+    ]
+    with multiprocessing.get_context('fork').Pool(args.workers) as pool:
+        done = pool.map(worker, jobs)
+
+    summary = {'profile': os.environ['SQLITE_PROFILE']}
+    for kind in ('read', 'write'):
+        latencies = sorted(sum((result[kind] for result, _ in done), []))
+        summary[f'{kind}s_per_s'] = round(len(latencies) / args.seconds, 1)
+        summary[f'{kind}_p95_ms'] = round(
+            percentile(latencies, 0.95) * 1000, 2)
+    summary['errors'] = sum(errors for _, errors in done)
+    print(json.dumps(summary))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument(
+        '--writes', type=float, default=0.2,
+        help='Fraction of requests that submit a citation')
+    parser.add_argument(
+        '--profiles', nargs='*', default=['default', 'production'])
+    parser.add_argument('--run', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_profile(args)
+        return
+
+    for profile in args.profiles:
+        output = subprocess.check_output(
+            [sys.executable, __file__, '--run',
+             '--workers', str(args.workers),
+             '--seconds', str(args.seconds),
+             '--writes', str(args.writes)],
+            env={**os.environ, 'SQLITE_PROFILE': profile,
+                 'REQUEST_TIMING': '0'},
+            text=True)
+        print(output.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    main()
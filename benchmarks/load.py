@@ -0,0 +1,280 @@
+"""
+Drive the API routes against an in-process server and report throughput,
+p50/p95/p99 latency and SQL queries per request.
+
+    python benchmarks/seed.py --citations 100000
+    python benchmarks/load.py --requests 200 --output results/base.json
+    python benchmarks/load.py --baseline results/base.json
+
+Requests go through the full Django handler and middleware stack using
+the test client, so no network or server process is involved. With
+--baseline, routes whose p95 latency or query count regressed beyond
+--tolerance are listed and the exit status is 1.
+"""
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ['DJANGO_SETTINGS_MODULE'] = 'benchmarks.settings'
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+
+from citation.models import Citation  # noqa: E402
+from user.models import User  # noqa: E402
+
+BENCH_DIR = Path(__file__).resolve().parent
+PASSWORD = 'Benchmark!Pass1'
+AGENCY = User.Agency.ALBANY
+
+
+class Session:
+    """Logged-in clients and sample data shared by the scenarios."""
+
+    def __init__(self):
+        self.client = Client()
+        self.clerk_email = f'clerk.{AGENCY}@example.com'
+        self.officer_email = f'officer0.{AGENCY}@example.com'
+        self.clerk = self.login(self.clerk_email)
+        self.officer = self.login(self.officer_email)
+        self.officer_id = User.objects.get(email=self.officer_email).id
+
+        sample = Citation.objects.filter(citation_agency=AGENCY).first()
+        self.violator = (sample.violator.oln_state, sample.violator.oln)
+        self.vin = sample.vehicle.vin
+        self.citation = json.loads(
+            (BENCH_DIR / 'citation.json').read_text())
+        self.citation['citation_agency'] = AGENCY
+        self.created = []
+        self.cursor = None
+        self.etag = None
+
+    def login(self, email):
+        response = self.post('/api/login', {
+            'email': email, 'password': PASSWORD})
+        token = response.json()['access_token']
+        return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def post(self, url, body, auth=None):
+        return self.client.post(
+            url, json.dumps(body), content_type='application/json',
+            **(auth or {}))
+
+    def get(self, url, auth=None):
+        return self.client.get(url, **(auth or {}))
+
+
+def login(s):
+    return s.post('/api/login', {
+        'email': s.officer_email, 'password': PASSWORD})
+
+
+def create_citation(s):
+    response = s.post('/api/citation/', s.citation, s.officer)
+    s.created.append(response.json()['id'])
+    return response
+
+
+def bulk_create(s):
+    return s.post('/api/citation/bulk', [s.citation] * 50, s.officer)
+
+
+def list_citations(s):
+    url = '/api/list_citations/?limit=100'
+    if s.cursor:
+        url += f'&cursor={s.cursor}'
+    response = s.get(url, s.clerk)
+    s.cursor = response.json()['next_cursor']
+    return response
+
+
+def list_citations_count(s):
+    return s.get('/api/list_citations/?limit=100&count=true', s.clerk)
+
+
+def list_citations_not_modified(s):
+    response = s.client.get(
+        '/api/list_citations/?limit=100',
+        HTTP_IF_NONE_MATCH=s.etag or '', **s.clerk)
+    s.etag = response['ETag']
+    return response
+
+
+def list_officer_citations(s):
+    return s.get('/api/list_officer_citations/?limit=100', s.officer)
+
+
+def list_by_violation(s):
+    return s.get('/api/list_citations/?limit=100&violation=UNSF', s.clerk)
+
+
+def search(s):
+    return s.get('/api/citations/search?q=garcia oak', s.clerk)
+
+
+def violator_history(s):
+    state, oln = s.violator
+    return s.get(f'/api/violators/{state}/{oln}/citations', s.clerk)
+
+
+def vehicle_history(s):
+    return s.get(f'/api/vehicles/{s.vin}/citations', s.clerk)
+
+
+def stats(s):
+    return s.get('/api/stats?dimension=county', s.clerk)
+
+
+def export_month(s):
+    start = datetime.now(timezone.utc) - timedelta(days=30)
+    response = s.get(
+        '/api/export_citations/?format=ndjson'
+        f'&start={start:%Y-%m-%dT%H:%M:%S}Z', s.clerk)
+    b''.join(response.streaming_content)
+    return response
+
+
+def users(s):
+    return s.get('/api/users?type=officer')
+
+
+def user_detail(s):
+    return s.get(f'/api/users/{s.officer_id}')
+
+
+def delete_citation(s):
+    return s.client.delete(
+        f'/api/citation/{s.created.pop()}', **s.officer)
+
+
+SCENARIOS = [
+    (login, 1),
+    (create_citation, 1),
+    (bulk_create, 0.1),
+    (list_citations, 1),
+    (list_citations_count, 1),
+    (list_citations_not_modified, 1),
+    (list_officer_citations, 1),
+    (list_by_violation, 1),
+    (search, 1),
+    (violator_history, 1),
+    (vehicle_history, 1),
+    (stats, 1),
+    (export_month, 0.1),
+    (users, 1),
+    (user_detail, 1),
+    (delete_citation, 1),
+]
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def measure(scenario, session, count):
+    latencies = []
+    queries = 0
+    statuses = {}
+    started = time.perf_counter()
+    for _ in range(count):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = scenario(session)
+            latencies.append(time.perf_counter() - start)
+        queries += len(captured)
+        statuses[response.status_code] = statuses.get(
+            response.status_code, 0) + 1
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': count,
+        'statuses': statuses,
+        'throughput': round(count / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'queries_per_request': round(queries / count, 2),
+    }
+
+
+def regressions(results, baseline, tolerance):
+    found = []
+    for name, current in results['routes'].items():
+        before = baseline['routes'].get(name)
+        if not before:
+            continue
+        if current['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            found.append(
+                f"{name}: p95 {before['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current['queries_per_request'] > before['queries_per_request']:
+            found.append(
+                f"{name}: queries {before['queries_per_request']} -> "
+                f"{current['queries_per_request']}")
+    return found
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=BENCH_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--only', nargs='*', help='Scenario names to run')
+    parser.add_argument('--output', type=Path)
+    parser.add_argument('--baseline', type=Path)
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    session = Session()
+    results = {
+        'meta': {
+            'revision': git_revision(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'database': str(connection.settings_dict['NAME']),
+            'citations': Citation.objects.count(),
+        },
+        'routes': {},
+    }
+    for scenario, weight in SCENARIOS:
+        name = scenario.__name__
+        if args.only and name not in args.only:
+            continue
+        count = max(1, int(args.requests * weight))
+        results['routes'][name] = measure(scenario, session, count)
+        print(name, results['routes'][name], file=sys.stderr)
+
+    output = args.output or BENCH_DIR / 'results' / (
+        f"{results['meta']['timestamp'][:19].replace(':', '')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f'Saved {output}', file=sys.stderr)
+
+    if args.baseline:
+        found = regressions(
+            results, json.loads(args.baseline.read_text()), args.tolerance)
+        for line in found:
+            print(f'REGRESSION {line}', file=sys.stderr)
+        sys.exit(1 if found else 0)
+
+
+if __name__ == '__main__':
+    main()
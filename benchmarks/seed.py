@@ -0,0 +1,262 @@
+"""
+Seed the benchmark database with realistic synthetic data.
+
+    python benchmarks/seed.py --citations 1000000
+
+Officers and clerks are created for every User.Agency, then citations
+are drawn from the model's ST, COLOR, V_L and ONL_T choices and written
+with executemany in large transactions. Violators, vehicles, violations
+and rollups are filled in so every route has data to work on. The same
+--seed always produces the same database.
+"""
+from datetime import datetime, timedelta, timezone
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ['DJANGO_SETTINGS_MODULE'] = 'benchmarks.settings'
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.hashers import make_password  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+
+from citation import rollups, sync, versions  # noqa: E402
+from citation.models import (  # noqa: E402
+    FACTOR_FIELDS, Citation, CitationViolation, Vehicle, Violator)
+from citation.signatures import signature_name  # noqa: E402
+from user.models import User  # noqa: E402
+
+PASSWORD = 'Benchmark!Pass1'
+BATCH = 20000
+
+FIRST = ['James', 'Maria', 'Robert', 'Linda', 'Michael', 'Ana', 'David',
+         'Susan', 'Jose', 'Karen', 'Wei', 'Priya', 'Omar', 'Emily']
+LAST = ['Smith', 'Garcia', 'Johnson', 'Nguyen', 'Brown', 'Lopez', 'Lee',
+        'Miller', 'Davis', 'Martinez', 'Wilson', 'Patel', 'Kim', 'Clark']
+STREETS = ['Main St', 'Oak Ave', 'Elm St', 'Broadway', 'Park Blvd',
+           'Solano Ave', 'San Pablo Ave', 'Marin Ave', 'Pine St']
+COUNTIES = ['Alameda', 'Contra Costa', 'Sacramento', 'Los Angeles']
+CITIES = ['Albany', 'Richmond', 'Sacramento', 'Pasadena', 'Berkeley']
+MAKES = [('Ford', 'Focus'), ('Toyota', 'Camry'), ('Honda', 'Civic'),
+         ('Tesla', 'Model 3'), ('Chevrolet', 'Malibu'), ('Nissan', 'Leaf')]
+COURTS = ['Albany Superior', 'Richmond Municipal', 'Sacramento County',
+          'Pasadena Traffic']
+
+
+def codes(choices):
+    return [code for code, _ in choices]
+
+
+def db_datetime(value):
+    """The text form Django's SQLite backend stores datetimes in."""
+    return value.astimezone(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def seed_users(officers_per_agency):
+    password = make_password(PASSWORD)
+    users = []
+    for agency in User.Agency.values:
+        users.append(User(
+            email=f'clerk.{agency}@example.com', name=f'Clerk {agency}',
+            agency=agency, role=User.Role.CLERK, is_staff=True,
+            password=password))
+        users.extend(
+            User(
+                email=f'officer{n}.{agency}@example.com',
+                name=f'Officer {n}', agency=agency, badge=n,
+                role=User.Role.OFFICER, password=password)
+            for n in range(officers_per_agency))
+    User.objects.bulk_create(users, batch_size=1000)
+    return list(
+        User.objects
+        .filter(role=User.Role.OFFICER)
+        .values_list('id', 'agency'))
+
+
+def seed_identities(rng, drivers, vehicles):
+    states = codes(Citation.ST)
+    Violator.objects.bulk_create(
+        (
+            Violator(
+                oln_state=rng.choice(states), oln=n,
+                name=f'{rng.choice(FIRST)} {rng.choice(LAST)}',
+                address=f'{rng.randint(1, 9999)} {rng.choice(STREETS)}',
+                city=rng.choice(CITIES), state='CA')
+            for n in range(1, drivers + 1)
+        ),
+        batch_size=5000)
+    Vehicle.objects.bulk_create(
+        (
+            Vehicle(vin=f'VIN{n:014d}', make=make, model=model,
+                    year=rng.randint(1995, 2023), color='Black')
+            for n in range(1, vehicles + 1)
+            for make, model in [rng.choice(MAKES)]
+        ),
+        batch_size=5000)
+    return (
+        list(Violator.objects.values_list(
+            'id', 'oln_state', 'oln', 'name', 'address', 'city')),
+        list(Vehicle.objects.values_list(
+            'id', 'vin', 'make', 'model', 'year')),
+    )
+
+
+def citation_rows(rng, count, officers, violators, vehicles, start):
+    """Yield (citation row, violation codes) pairs."""
+    colors = codes(Citation.COLOR)
+    classes = codes(Citation.ONL_T)
+    violation_codes = codes(Citation.V_L)
+    span = int((datetime.now(timezone.utc) - start).total_seconds())
+
+    for _ in range(count):
+        officer_id, agency = rng.choice(officers)
+        violator = rng.choice(violators)
+        vehicle = rng.choice(vehicles)
+        issued = start + timedelta(seconds=rng.randrange(span))
+        factors = sum(
+            1 << bit for bit in range(len(FACTOR_FIELDS))
+            if rng.random() < 0.1)
+        yield (
+            db_datetime(issued - timedelta(minutes=rng.randint(1, 30))),
+            rng.choice(STREETS),
+            rng.choice(COUNTIES),
+            rng.choice(CITIES),
+            rng.choice(['Traffic stop', 'Collision', 'Parking']),
+            violator[1],
+            violator[2],
+            rng.choice(classes),
+            rng.random() < 0.05,
+            violator[3],
+            db_datetime(issued - timedelta(days=rng.randint(6000, 25000))),
+            rng.choice('MF'),
+            rng.choice(colors),
+            rng.choice(colors),
+            f'{rng.randint(150, 200)}',
+            violator[4],
+            violator[5],
+            'CA',
+            rng.randint(2000000, 9999999),
+            f'driver{violator[2]}@example.com',
+            'Passenger car',
+            vehicle[1],
+            rng.choice(['Black', 'White', 'Silver', 'Red', 'Blue']),
+            vehicle[4],
+            vehicle[2],
+            vehicle[3],
+            factors,
+            f'Badge {officer_id}',
+            officer_id,
+            agency,
+            db_datetime(issued),
+            rng.choice(COURTS),
+            db_datetime(issued + timedelta(days=rng.randint(14, 90))),
+            signature_name(f'{rng.getrandbits(256):064x}'),
+            violator[0],
+            vehicle[0],
+        ), rng.sample(violation_codes, rng.randint(1, len(violation_codes)))
+
+
+CITATION_COLUMNS = [
+    'violation_datetime', 'violation_route', 'violation_county',
+    'violation_city', 'contact_type', 'oln_state', 'oln', 'oln_class', 'cdl',
+    'violator_name', 'violator_dob', 'violator_gender', 'violator_hair',
+    'violator_eyes', 'violator_height', 'violator_address', 'violator_city',
+    'violator_state', 'violator_phone', 'violator_email', 'vehicle_type',
+    'vehicle_vin', 'vehicle_color', 'vehicle_year', 'vehicle_make',
+    'vehicle_model', 'factors', 'issued_by', 'officer_id',
+    'citation_agency', 'issued_datetime', 'court', 'court_appearance_date',
+    'violator_signature', 'violator_id', 'vehicle_id', 'change_seq',
+]
+
+
+def seed_citations(rows):
+    citations = Citation._meta.db_table
+    violations = CitationViolation._meta.db_table
+    insert = (
+        f"INSERT INTO {citations} ({', '.join(CITATION_COLUMNS)}) "
+        f"VALUES ({', '.join(['%s'] * len(CITATION_COLUMNS))})"
+    )
+    insert_violation = (
+        f"INSERT INTO {violations} (citation_id, position, code) "
+        "VALUES (%s, %s, %s)"
+    )
+
+    total = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {citations}")
+        next_id = cursor.fetchone()[0] + 1
+        batch, charges = [], []
+        for row, row_codes in rows:
+            batch.append(row)
+            charges.extend(
+                (next_id, position, code)
+                for position, code in enumerate(row_codes))
+            next_id += 1
+            if len(batch) == BATCH:
+                total += _flush(cursor, insert, batch,
+                                insert_violation, charges)
+                batch, charges = [], []
+        total += _flush(cursor, insert, batch, insert_violation, charges)
+    return total
+
+
+def _flush(cursor, insert, batch, insert_violation, charges):
+    if not batch:
+        return 0
+    with transaction.atomic():
+        first = versions.advance(sync.SEQUENCE, len(batch)) - len(batch) + 1
+        cursor.executemany(
+            insert, [(*row, seq) for seq, row in enumerate(batch, first)])
+        cursor.executemany(insert_violation, charges)
+    print(f'.. {len(batch)} citations', file=sys.stderr, end='\r')
+    return len(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--citations', type=int, default=100000)
+    parser.add_argument('--officers', type=int, default=25,
+                        help='Officers per agency')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--years', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    db = Path(connection.settings_dict['NAME'])
+    if db.resolve() != Path(settings.BENCH_DB).resolve():
+        sys.exit(f'Refusing to delete {db}, not the benchmark database')
+    for path in db.parent.glob(db.name + '*'):
+        path.unlink()
+
+    started = time.perf_counter()
+    call_command('migrate', verbosity=0)
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=OFF')
+
+    officers = seed_users(args.officers)
+    violators, vehicles = seed_identities(
+        rng,
+        drivers=max(1, args.citations // 3),
+        vehicles=max(1, args.citations // 4))
+    start = datetime.now(timezone.utc) - timedelta(days=365 * args.years)
+    total = seed_citations(citation_rows(
+        rng, args.citations, officers, violators, vehicles, start))
+    rollups.rebuild()
+
+    print(
+        f'\nSeeded {total} citations, {len(officers)} officers into {db} '
+        f'in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Compare the schema path and the values_list() fast path used to render
+citation list pages.
+
+    python benchmarks/seed.py --citations 100000
+    python benchmarks/serialization.py --limits 10 100 1000
+
+The schema path is what ninja does for a paginated List[getCitationSchema]
+response: model instances with prefetched violations, validated through
+CitationPage and rendered with its JSON renderer. Both paths render the
+same page of the same agency and the command fails if their bytes differ.
+"""
+from pathlib import Path
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ['DJANGO_SETTINGS_MODULE'] = 'benchmarks.settings'
+
+import django  # noqa: E402
+
+django.setup()
+
+from ninja.renderers import JSONRenderer  # noqa: E402
+
+from citation.models import Citation  # noqa: E402
+from citation.pagination import CursorPagination  # noqa: E402
+from citationapp.urls import CitationPage, citation_encoder  # noqa: E402
+from user.models import User  # noqa: E402
+
+AGENCY = User.Agency.ALBANY
+
+
+def schema_path(citations, pagination):
+    page = CursorPagination().paginate_queryset(
+        citations.prefetch_related('violations'), pagination)
+    data = CitationPage(**page).dict()
+    return JSONRenderer().render(None, data, response_status=200)
+
+
+def fast_path(citations, pagination):
+    return citation_encoder.render_page(citations, pagination)
+
+
+def timings(render, citations, pagination, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = render(citations, pagination)
+        samples.append(time.perf_counter() - start)
+    return body, statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument(
+        '--limits', type=int, nargs='*', default=[10, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    citations = Citation.objects.filter(citation_agency=AGENCY)
+    for limit in args.limits:
+        pagination = CursorPagination.Input(limit=limit)
+        slow, slow_ms = timings(
+            schema_path, citations, pagination, args.repeat)
+        fast, fast_ms = timings(
+            fast_path, citations, pagination, args.repeat)
+        if slow != fast:
+            sys.exit(f'limit={limit}: fast path output differs')
+        print(
+            f'limit={limit:<5} schema {slow_ms:8.2f}ms  '
+            f'fast {fast_ms:8.2f}ms  x{slow_ms / fast_ms:.1f}  '
+            f'{len(fast)} bytes')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+"""
+Settings for the benchmark harness: the project settings pointed at a
+throwaway database, BENCH_DB or benchmarks/bench.sqlite3. The benchmark
+scripts always use them, whatever DJANGO_SETTINGS_MODULE says, since they
+write to (and seed.py deletes) the database.
+"""
+import os
+
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+
+from citationapp.settings import *  # noqa: E402,F401,F403
+from citationapp.settings import (  # noqa: E402
+    ANALYTICS, BASE_DIR, DATABASES, LOGIN_THROTTLE)
+
+DEBUG = False
+
+ALLOWED_HOSTS = ['localhost', '127.0.0.1', 'testserver']
+
+BENCH_DB = os.environ.get(
+    'BENCH_DB', BASE_DIR / 'benchmarks' / 'bench.sqlite3')
+
+DATABASES['default']['NAME'] = BENCH_DB
+
+ANALYTICS = {**ANALYTICS, 'ROOT': BASE_DIR / 'benchmarks' / 'analytics'}
+
+# load.py times the login route itself, many attempts from one client
+LOGIN_THROTTLE = {**LOGIN_THROTTLE, 'ENABLED': False}
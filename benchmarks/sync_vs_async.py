@@ -0,0 +1,174 @@
+"""
+Compare WSGI (sync views, gunicorn threads) against ASGI (async views,
+uvicorn) throughput at high concurrency.
+
+    python benchmarks/sync_vs_async.py --concurrency 256 --requests 20000
+
+Both servers are started against the same database with the same number
+of worker processes. The load generator is a keep-alive HTTP/1.1 client
+built on asyncio streams so it needs nothing beyond the standard library.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PASSWORD = 'Benchmark!Pass1'
+
+SERVERS = {
+    'wsgi': {
+        'prefix': '/api',
+        'command': lambda port, workers, threads: [
+            'gunicorn', 'citationapp.wsgi:application',
+            '--bind', f'127.0.0.1:{port}',
+            '--workers', str(workers),
+            '--threads', str(threads),
+        ],
+    },
+    'asgi': {
+        'prefix': '/api/async',
+        'command': lambda port, workers, threads: [
+            'uvicorn', 'citationapp.asgi:application',
+            '--host', '127.0.0.1',
+            '--port', str(port),
+            '--workers', str(workers),
+            '--no-access-log',
+        ],
+    },
+}
+
+
+def call(url, body=None, token=None, method=None):
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data, headers, method=method)
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read() or b'null')
+
+
+def wait_ready(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url)
+            return
+        except Exception:
+            time.sleep(0.2)
+    raise RuntimeError(f'{url} did not start')
+
+
+def officer_token(base, email):
+    """Create (or reuse) an officer and return its access token."""
+    try:
+        call(f'{base}/create-officer/?agency=albany', {
+            'name': 'Benchmark', 'email': email,
+            'password': PASSWORD, 'badge': 1,
+        })
+    except urllib.error.HTTPError as e:
+        if e.code != 409:
+            raise
+    login = call(f'{base}/login', {'email': email, 'password': PASSWORD})
+    return login['access_token']
+
+
+async def worker(host, port, path, token, count, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    request = (
+        f'GET {path} HTTP/1.1\r\n'
+        f'Host: {host}\r\n'
+        f'Authorization: Bearer {token}\r\n'
+        '\r\n'
+    ).encode()
+    for _ in range(count):
+        start = time.perf_counter()
+        writer.write(request)
+        await writer.drain()
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode().partition(':')
+            if name.lower() == 'content-length':
+                length = int(value)
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+
+async def drive(port, path, token, concurrency, total):
+    latencies = []
+    per_worker = max(1, total // concurrency)
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        worker('127.0.0.1', port, path, token, per_worker, latencies)
+        for _ in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'seconds': round(elapsed, 3),
+        'throughput': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p99_ms': round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+    }
+
+
+def run(mode, args, port):
+    server = SERVERS[mode]
+    command = server['command'](port, args.workers, args.threads)
+    process = subprocess.Popen(
+        command, cwd=BASE_DIR, env=os.environ.copy(),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base = f'http://127.0.0.1:{port}{server["prefix"]}'
+        wait_ready(f'http://127.0.0.1:{port}/api/docs')
+        token = officer_token(base, f'bench.{mode}@example.com')
+        for _ in range(args.seed):
+            call(f'{base}/citation/', json.loads(args.citation.read_text()),
+                 token)
+        path = f'{server["prefix"]}{args.path}'
+        return asyncio.run(
+            drive(port, path, token, args.concurrency, args.requests))
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--concurrency', type=int, default=256)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--path', default='/list_officer_citations/')
+    parser.add_argument('--seed', type=int, default=50)
+    parser.add_argument(
+        '--citation', type=Path,
+        default=BASE_DIR / 'benchmarks' / 'citation.json')
+    parser.add_argument('--output', type=Path)
+    args = parser.parse_args()
+
+    results = {}
+    for port, mode in enumerate(SERVERS, 8101):
+        results[mode] = run(mode, args, port)
+        print(mode, results[mode], file=sys.stderr)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+"""
+Columnar snapshot of the citations for heatmaps and histograms.
+
+Each citation is one row of a set of NumPy arrays saved as .npy files and
+memory-mapped by the API processes: its id, the dictionary-encoded agency,
+county, city and first violation code, the violation time as epoch
+seconds and its Citation.factors bits in one byte. Queries are vectorized
+masks and bincounts over those arrays instead of ORM rows.
+
+refresh() only reads what the change feed (see citation.sync) reports
+since the snapshot was taken, and publishes the new arrays by swapping
+the ANALYTICS['ROOT']/current symlink, so readers never see a half
+written snapshot. Only the refresh_analytics command builds snapshots: the
+API answers from the published one, and has none to answer from until the
+command has run once.
+"""
+from pathlib import Path
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import OuterRef, Subquery
+
+from citation import sync, versions
+from citation.dockets import day_bounds
+from citation.models import (
+    FACTOR_FIELDS, Citation, CitationTombstone, CitationViolation)
+
+_config = getattr(settings, 'ANALYTICS', {})
+ROOT = Path(_config.get('ROOT', settings.BASE_DIR / 'analytics'))
+CHUNK_SIZE = _config.get('CHUNK_SIZE', 50_000)
+
+# Dictionary-encoded columns and the Citation values they are read from
+DICTIONARIES = {
+    'agency': 'citation_agency',
+    'county': 'violation_county',
+    'city': 'violation_city',
+    'violation': 'violation_0',
+}
+
+COLUMNS = {
+    'id': np.int64,
+    **dict.fromkeys(DICTIONARIES, np.int32),
+    'time': np.int64,
+    'factors': np.uint8,
+}
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+# 1970-01-01 was a Thursday
+EPOCH_WEEKDAY = 3
+
+# Snapshot of this process, by path
+_loaded = {}
+
+
+class Dimension(models.TextChoices):
+    HOUR_OF_WEEK = 'hour_of_week'
+    HOUR = 'hour'
+    WEEKDAY = 'weekday'
+    MONTH = 'month'
+    COUNTY = 'county'
+    CITY = 'city'
+    VIOLATION = 'violation'
+
+
+class Snapshot:
+    """The arrays and dictionaries of one published snapshot."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        meta = json.loads((path / 'meta.json').read_text())
+        self.seq = meta['seq']
+        self.dictionaries = meta['dictionaries']
+        self.columns = {
+            name: np.load(path / f'{name}.npy', mmap_mode='r')
+            for name in COLUMNS
+        }
+
+    def __len__(self):
+        return len(self.columns['id'])
+
+    def code(self, column: str, value: str) -> int:
+        """Dictionary code of value, -1 if no row has it."""
+        try:
+            return self.dictionaries[column].index(value)
+        except ValueError:
+            return -1
+
+
+def _rows(citations):
+    first_violation = (
+        CitationViolation.objects
+        .filter(citation=OuterRef('pk'), position=0)
+        .values('code')[:1]
+    )
+    return (
+        citations
+        .annotate(violation_0=Subquery(first_violation))
+        .order_by()
+        .values_list(
+            'id', *DICTIONARIES.values(), 'violation_datetime', 'factors')
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def _encode(citations, dictionaries: dict) -> dict:
+    """Columns of citations, extending dictionaries with new values."""
+    indexes = {
+        name: {value: code for code, value in enumerate(values)}
+        for name, values in dictionaries.items()
+    }
+
+    def encode(name, value):
+        index = indexes[name]
+        if value not in index:
+            index[value] = len(dictionaries[name])
+            dictionaries[name].append(value)
+        return index[value]
+
+    ids, times, factors = [], [], []
+    codes = {name: [] for name in DICTIONARIES}
+    for row in _rows(citations):
+        ids.append(row[0])
+        for name, value in zip(DICTIONARIES, row[1:]):
+            codes[name].append(encode(name, value or ''))
+        times.append(int(row[-2].timestamp()))
+        factors.append(row[-1])
+
+    return {
+        'id': np.array(ids, dtype=COLUMNS['id']),
+        **{
+            name: np.array(values, dtype=COLUMNS[name])
+            for name, values in codes.items()
+        },
+        'time': np.array(times, dtype=COLUMNS['time']),
+        'factors': np.array(factors, dtype=COLUMNS['factors']),
+    }
+
+
+def load() -> Snapshot | None:
+    """The published snapshot, None if none was built yet."""
+    link = ROOT / 'current'
+    if not link.exists():
+        return None
+    path = link.resolve()
+    if path not in _loaded:
+        _loaded.clear()
+        _loaded[path] = Snapshot(path)
+    return _loaded[path]
+
+
+def _publish(seq: int, columns: dict, dictionaries: dict) -> Snapshot:
+    ROOT.mkdir(parents=True, exist_ok=True)
+    target = Path(tempfile.mkdtemp(dir=ROOT, prefix=f'snapshot-{seq}-'))
+    for name, values in columns.items():
+        np.save(target / f'{name}.npy', values)
+    (target / 'meta.json').write_text(json.dumps({
+        'seq': seq,
+        'dictionaries': dictionaries,
+        'factors': FACTOR_FIELDS,
+    }))
+
+    link = ROOT / f'.current-{os.getpid()}'
+    link.unlink(missing_ok=True)
+    link.symlink_to(target.name)
+    os.replace(link, ROOT / 'current')
+
+    # Keep the previous snapshot for readers that still map it
+    for old in sorted(ROOT.glob('snapshot-*'), key=os.path.getmtime)[:-2]:
+        shutil.rmtree(old, ignore_errors=True)
+    return Snapshot(target)
+
+
+def refresh(full: bool = False) -> Snapshot:
+    """
+    Bring the snapshot up to date with the change feed, re-reading every
+    citation if full or if there is no snapshot yet.
+    """
+    snapshot = None if full else load()
+    since = snapshot.seq if snapshot else 0
+
+    # One read transaction, so the rows match the sequence value
+    with transaction.atomic():
+        seq = versions.current(sync.SEQUENCE)[0]
+        if snapshot and seq == snapshot.seq:
+            return snapshot
+
+        changed = Citation.objects.filter(
+            change_seq__gt=since, change_seq__lte=seq)
+        dictionaries = {
+            name: list(snapshot.dictionaries[name]) if snapshot else []
+            for name in DICTIONARIES
+        }
+        added = _encode(changed, dictionaries)
+        deleted = list(
+            CitationTombstone.objects
+            .filter(change_seq__gt=since, change_seq__lte=seq)
+            .values_list('citation_id', flat=True)
+        ) if snapshot else []
+
+    if snapshot:
+        # Updated citations are replaced, deleted ones dropped
+        ids = snapshot.columns['id']
+        keep = ~np.isin(ids, np.concatenate([added['id'], deleted]))
+        columns = {
+            name: np.concatenate([snapshot.columns[name][keep], added[name]])
+            for name in COLUMNS
+        }
+    else:
+        columns = added
+    return _publish(seq, columns, dictionaries)
+
+
+def current() -> Snapshot | None:
+    """The published snapshot, None until refresh_analytics built one."""
+    return load()
+
+
+def select(snapshot: Snapshot, agency: str, start=None, end=None,
+           factors: int = 0) -> np.ndarray:
+    """
+    Indexes of the agency rows with a violation between the start and end
+    days and every factor bit of factors.
+    """
+    columns = snapshot.columns
+    mask = columns['agency'] == snapshot.code('agency', agency)
+    if start is not None:
+        mask &= columns['time'] >= day_bounds(start)[0].timestamp()
+    if end is not None:
+        mask &= columns['time'] < day_bounds(end)[1].timestamp()
+    if factors:
+        mask &= (columns['factors'] & factors) == factors
+    return np.flatnonzero(mask)
+
+
+def axis(snapshot: Snapshot, dimension: str, rows: np.ndarray) -> tuple:
+    """(code of each row along dimension, label of each code)."""
+    if dimension in DICTIONARIES:
+        return (
+            snapshot.columns[dimension][rows],
+            snapshot.dictionaries[dimension],
+        )
+
+    times = snapshot.columns['time'][rows]
+    hours = times // 3600
+    weekdays = (hours // 24 + EPOCH_WEEKDAY) % 7
+    if dimension == Dimension.HOUR:
+        return hours % 24, [f'{h:02d}:00' for h in range(24)]
+    if dimension == Dimension.WEEKDAY:
+        return weekdays, WEEKDAYS
+    if dimension == Dimension.HOUR_OF_WEEK:
+        return weekdays * 24 + hours % 24, [
+            f'{day} {h:02d}:00' for day in WEEKDAYS for h in range(24)]
+
+    months = times.astype('datetime64[s]').astype('datetime64[M]')
+    first = months.min() if len(months) else np.datetime64(0, 'M')
+    codes = (months - first).astype(np.int64)
+    size = int(codes.max()) + 1 if len(codes) else 0
+    return codes, [str(first + n) for n in range(size)]
+
+
+def _used(labels: list, counts: np.ndarray, dimension: str, along: int):
+    """Drop dictionary values no selected row has, keep time axes whole."""
+    if dimension not in DICTIONARIES:
+        return labels, counts
+    totals = counts if counts.ndim == 1 else counts.sum(axis=1 - along)
+    used = np.flatnonzero(totals)
+    return [labels[i] for i in used], np.take(counts, used, axis=along)
+
+
+def histogram(snapshot: Snapshot, rows: np.ndarray, dimension: str) -> dict:
+    codes, labels = axis(snapshot, dimension, rows)
+    counts = np.bincount(codes, minlength=len(labels))
+    labels, counts = _used(labels, counts, dimension, 0)
+    return {
+        'dimension': dimension,
+        'labels': labels,
+        'counts': counts.tolist(),
+        'total': len(rows),
+        'as_of': snapshot.seq,
+    }
+
+
+def heatmap(snapshot: Snapshot, rows: np.ndarray, row_dimension: str,
+            column_dimension: str) -> dict:
+    row_codes, row_labels = axis(snapshot, row_dimension, rows)
+    column_codes, column_labels = axis(snapshot, column_dimension, rows)
+    width = len(column_labels)
+    counts = np.bincount(
+        # Wide enough for every pair, as the int32 codes may not be
+        row_codes.astype(np.int64) * width + column_codes,
+        minlength=len(row_labels) * width,
+    ).reshape(len(row_labels), width)
+    row_labels, counts = _used(row_labels, counts, row_dimension, 0)
+    column_labels, counts = _used(
+        column_labels, counts, column_dimension, 1)
+    return {
+        'rows': row_dimension,
+        'columns': column_dimension,
+        'row_labels': row_labels,
+        'column_labels': column_labels,
+        'counts': counts.tolist(),
+        'total': len(rows),
+        'as_of': snapshot.seq,
+    }
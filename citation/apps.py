@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CitationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'citation'
+
+    def ready(self):
+        import citation.signals  # noqa: F401
+        import citationapp.sqlite  # noqa: F401
@@ -0,0 +1,120 @@
+"""
+Bulk citation submission helpers.
+"""
+import json
+
+from django.db import DatabaseError, transaction
+from pydantic import ValidationError
+
+from citation import rollups, sync, versions
+from citation.models import Citation, CitationViolation, link_identities
+
+BULK_CHUNK_SIZE = 200
+
+
+def parse_rows(body: bytes, content_type: str = "") -> list:
+    """
+    Split a JSON array or NDJSON body into raw rows.
+
+    Each row is either the decoded object or a ValueError describing why
+    that line could not be decoded, so one bad line does not reject the
+    rest of the upload.
+    """
+    text = body.decode("utf-8").strip()
+    if not text:
+        return []
+
+    if "ndjson" not in content_type and text.startswith("["):
+        rows = json.loads(text)
+        if not isinstance(rows, list):
+            raise ValueError("Expected a JSON array")
+        return rows
+
+    rows = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            rows.append(json.loads(line))
+        except ValueError as e:
+            rows.append(ValueError(f"Invalid JSON: {e}"))
+    return rows
+
+
+def _insert_chunk(chunk: list) -> list:
+    """
+    Insert a chunk of (index, citation, codes) rows in one transaction.
+
+    If the batch is rejected by the database, fall back to one insert per
+    row so only the offending rows are reported as failed.
+    """
+    try:
+        with transaction.atomic():
+            citations = [c for _, c, _ in chunk]
+            link_identities(citations)
+            sync.stamp(citations)
+            created = Citation.objects.bulk_create(citations)
+            CitationViolation.objects.bulk_create([
+                violation
+                for citation, (_, _, codes) in zip(created, chunk)
+                for violation in CitationViolation.for_citation(
+                    citation, codes)
+            ])
+            rollups.add_citations(
+                (citation, codes)
+                for citation, (_, _, codes) in zip(created, chunk))
+            versions.bump(*versions.citation_keys(created))
+        return [
+            {"index": i, "id": c.id}
+            for (i, _, _), c in zip(chunk, created)
+        ]
+
+    except DatabaseError:
+        results = []
+        for i, citation, codes in chunk:
+            try:
+                with transaction.atomic():
+                    citation.pk = None
+                    link_identities([citation])
+                    citation.save()
+                    CitationViolation.objects.bulk_create(
+                        CitationViolation.for_citation(citation, codes))
+                    rollups.add_citations([(citation, codes)])
+                results.append({"index": i, "id": citation.id})
+            except DatabaseError as e:
+                results.append({"index": i, "error": str(e)})
+        return results
+
+
+def bulk_create_citations(officer, rows: list, schema, build) -> list:
+    """
+    Validate rows against schema and insert the valid ones in batches.
+
+    ``build(officer, payload)`` turns a validated payload into an unsaved
+    Citation and its violation codes. Returns one result per row, in
+    input order.
+    """
+    results = []
+    pending = []
+
+    for index, row in enumerate(rows):
+        if isinstance(row, Exception):
+            results.append({"index": index, "error": str(row)})
+            continue
+
+        try:
+            payload = schema.parse_obj(row)
+        except ValidationError as e:
+            results.append({"index": index, "error": e.errors()})
+            continue
+
+        pending.append((index, *build(officer, payload)))
+        if len(pending) >= BULK_CHUNK_SIZE:
+            results.extend(_insert_chunk(pending))
+            pending = []
+
+    if pending:
+        results.extend(_insert_chunk(pending))
+
+    results.sort(key=lambda r: r["index"])
+    return results
@@ -0,0 +1,57 @@
+"""
+Court dockets: the appearances scheduled at a court on a given day, read
+from the (court, court_appearance_date) index and grouped by time slot.
+"""
+from datetime import datetime, time, timedelta
+from itertools import groupby
+
+from django.utils import timezone
+
+from citation.models import Citation, CitationViolation
+
+ENTRY_FIELDS = ('id', 'violator_name', 'oln_state', 'oln', 'officer_id')
+
+
+def day_bounds(day) -> tuple:
+    """[start, end) of a day in the current time zone."""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def docket(agency: str, court: str, day) -> dict:
+    """
+    The agency's appearances at court on day, one slot per appearance
+    time in time order, each listing its citations with their codes.
+    """
+    start, end = day_bounds(day)
+    rows = list(
+        Citation.objects
+        .filter(
+            court=court,
+            court_appearance_date__gte=start,
+            court_appearance_date__lt=end,
+            citation_agency=agency)
+        .order_by('court_appearance_date', 'id')
+        .values_list('court_appearance_date', *ENTRY_FIELDS)
+    )
+    codes = CitationViolation.codes_by_citation([row[1] for row in rows])
+
+    slots = [
+        {
+            "time": slot,
+            "citations": [
+                {
+                    **dict(zip(ENTRY_FIELDS, entry[1:])),
+                    "violations": codes[entry[1]],
+                }
+                for entry in entries
+            ],
+        }
+        for slot, entries in groupby(rows, key=lambda row: row[0])
+    ]
+    return {
+        "court": court,
+        "date": day,
+        "count": len(rows),
+        "slots": slots,
+    }
@@ -0,0 +1,89 @@
+"""
+Streaming CSV/NDJSON export of citations.
+"""
+from io import StringIO
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from citation.models import (
+    FACTOR_FIELDS, Citation, CitationViolation, citation_column)
+
+EXPORT_CHUNK_SIZE = 500
+
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def export_fields() -> list:
+    """
+    Citation column names of the export, in model order, with the factor
+    flags in place of the factors bitmask.
+    """
+    fields = []
+    for field in Citation._meta.concrete_fields:
+        if field.name == 'factors':
+            fields += FACTOR_FIELDS
+        else:
+            fields.append(field.attname)
+    return fields
+
+
+def _chunks(queryset, fields):
+    """
+    Lists of plain tuples read from a server-side cursor, each row
+    followed by its violation codes fetched once per chunk.
+    """
+    rows = (
+        queryset
+        .values_list(*map(citation_column, fields))
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == EXPORT_CHUNK_SIZE:
+            yield _with_violations(chunk)
+            chunk = []
+    if chunk:
+        yield _with_violations(chunk)
+
+
+def _with_violations(chunk):
+    codes = CitationViolation.codes_by_citation(row[0] for row in chunk)
+    return [(*row, codes[row[0]]) for row in chunk]
+
+
+def stream_csv(queryset):
+    """Yield the export as CSV, one chunk of rows per string."""
+    fields = export_fields()
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields + ["violations"])
+    yield buffer.getvalue()
+
+    for chunk in _chunks(queryset, fields):
+        buffer.seek(0)
+        buffer.truncate()
+        for *row, codes in chunk:
+            writer.writerow(row + [";".join(codes)])
+        yield buffer.getvalue()
+
+
+def stream_ndjson(queryset):
+    """Yield the export as NDJSON, one chunk of rows per string."""
+    fields = export_fields() + ["violations"]
+    encoder = DjangoJSONEncoder()
+
+    for chunk in _chunks(queryset, fields[:-1]):
+        yield "".join(
+            encoder.encode(dict(zip(fields, row))) + "\n" for row in chunk
+        )
+
+
+STREAMS = {
+    "csv": stream_csv,
+    "ndjson": stream_ndjson,
+}
@@ -0,0 +1,92 @@
+"""
+Idempotency-Key handling for citation creation.
+
+Field devices retry POST /citation/ whenever a response is lost. A request
+carrying an Idempotency-Key records the key with the citation it created,
+in the same transaction, and a retry with the same key is answered with
+that citation from one lookup on the (officer, key) index. Keys older than
+IDEMPOTENCY['TTL'] are ignored and purged in batches.
+"""
+from datetime import timedelta
+from hashlib import sha1
+
+from django.conf import settings
+from django.utils import timezone
+
+from citation.models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+_config = getattr(settings, 'IDEMPOTENCY', {})
+TTL = timedelta(seconds=_config.get('TTL', 24 * 60 * 60))
+PURGE_BATCH = _config.get('PURGE_BATCH', 1000)
+
+
+class InvalidKey(Exception):
+    """The key is longer than the column holding it."""
+
+
+class KeyReused(Exception):
+    """The key was already used for a request with a different body."""
+
+
+def fingerprint(body: bytes) -> str:
+    return sha1(body).hexdigest()
+
+
+def request_key(request) -> IdempotencyKey | None:
+    """The unsaved key sent with an authenticated request, if any."""
+    key = request.headers.get(HEADER)
+    if not key:
+        return None
+    if len(key) > IdempotencyKey._meta.get_field('key').max_length:
+        raise InvalidKey(key)
+    return IdempotencyKey(
+        officer_id=request.auth.id,
+        key=key,
+        fingerprint=fingerprint(request.body))
+
+
+def lookup(key: IdempotencyKey) -> int | None:
+    """
+    Id of the citation created with key, None if the key is new or expired.
+    Raises KeyReused if it was sent with another body.
+    """
+    row = (
+        IdempotencyKey.objects
+        .filter(
+            officer_id=key.officer_id,
+            key=key.key,
+            created__gte=timezone.now() - TTL)
+        .values_list('fingerprint', 'citation_id')
+        .first()
+    )
+    if row is None:
+        return None
+    if row[0] != key.fingerprint:
+        raise KeyReused(key.key)
+    return row[1]
+
+
+def remember(key: IdempotencyKey, citation):
+    """Record key for citation, inside the transaction that created it."""
+    # An expired key can be sent again before it is purged
+    IdempotencyKey.objects.filter(
+        officer_id=key.officer_id,
+        key=key.key,
+        created__lt=timezone.now() - TTL).delete()
+    key.citation_id = citation.id
+    key.save()
+
+
+def purge(batch: int = PURGE_BATCH) -> int:
+    """Delete expired keys, batch rows per statement. Returns the count."""
+    expired = IdempotencyKey.objects.filter(
+        created__lt=timezone.now() - TTL)
+    purged = 0
+    while True:
+        ids = list(expired.values_list('id', flat=True)[:batch])
+        if not ids:
+            return purged
+        purged += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
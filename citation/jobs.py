@@ -0,0 +1,217 @@
+"""
+Database-backed background jobs.
+
+Request handlers only enqueue: a Job row is inserted in the request's own
+transaction, so work is queued exactly when the data it refers to is
+committed. The run_jobs worker claims due jobs in batches, highest
+priority first, with a single UPDATE ... RETURNING, runs them on a thread
+or process pool and retries failures with exponential backoff. A job whose
+worker died is claimed again after JOBS['TIMEOUT_SECONDS'].
+
+A job that still fails after JOBS['MAX_ATTEMPTS'] is logged as an error and
+the fallback registered for its task with on_give_up, if any, is queued.
+"""
+from contextvars import ContextVar
+from datetime import timedelta
+import json
+import logging
+import traceback
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import (
+    Avg, Count, DurationField, ExpressionWrapper, F, Max, Min)
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from citation.models import Job
+
+logger = logging.getLogger(__name__)
+
+_config = getattr(settings, 'JOBS', {})
+BATCH = _config.get('BATCH', 20)
+MAX_ATTEMPTS = _config.get('MAX_ATTEMPTS', 5)
+BACKOFF_SECONDS = _config.get('BACKOFF_SECONDS', 2)
+TIMEOUT = timedelta(seconds=_config.get('TIMEOUT_SECONDS', 300))
+
+Priority = Job.Priority
+Status = Job.Status
+
+_current = ContextVar('job', default=None)
+_fallbacks = {}
+
+CLAIM_SQL = f"""
+    UPDATE {Job._meta.db_table}
+    SET status = %s, worker = %s, claimed_at = %s, attempts = attempts + 1
+    WHERE id IN (
+        SELECT id FROM {Job._meta.db_table}
+        WHERE status = %s AND run_at <= %s
+        ORDER BY priority DESC, run_at
+        LIMIT %s
+    )
+    RETURNING id, task, args, attempts
+"""
+
+
+def task_name(func) -> str:
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+def enqueue(func, *args, priority: int = Priority.NORMAL, delay: float = 0):
+    """
+    Queue func(*args) to run in the worker. func must be a module level
+    function and args JSON serializable.
+    """
+    return Job.objects.create(
+        task=task_name(func),
+        args=list(args),
+        priority=priority,
+        run_at=timezone.now() + timedelta(seconds=delay))
+
+
+def on_give_up(func, fallback):
+    """Queue fallback() whenever a job of func fails for good."""
+    _fallbacks[task_name(func)] = fallback
+
+
+def cancel(func) -> int:
+    """Delete the jobs of func that have not succeeded, running ones too."""
+    return Job.objects.filter(
+        task=task_name(func),
+    ).exclude(status=Status.DONE).delete()[0]
+
+
+def claimed() -> bool:
+    """
+    Whether the job being run is still claimed by this worker, always True
+    outside jobs. Call it in the transaction of the job's writes and skip
+    them if False: the job was cancelled, or requeued as stale. It writes
+    the job row, so it cannot be cancelled until the transaction ends.
+    """
+    job_id = _current.get()
+    if job_id is None:
+        return True
+    return bool(Job.objects.filter(
+        id=job_id, status=Status.RUNNING).update(status=Status.RUNNING))
+
+
+def _now():
+    return connection.ops.adapt_datetimefield_value(timezone.now())
+
+
+def requeue_stale() -> int:
+    """Queue again the jobs of workers that stopped answering."""
+    return Job.objects.filter(
+        status=Status.RUNNING,
+        claimed_at__lt=timezone.now() - TIMEOUT,
+    ).update(status=Status.QUEUED, run_at=timezone.now())
+
+
+def claim(worker: str, batch: int = BATCH) -> list:
+    """
+    Mark up to batch due jobs, highest priority first, as running by
+    worker and return them as (id, task, args, attempts).
+    """
+    now = _now()
+    with connection.cursor() as cursor:
+        cursor.execute(CLAIM_SQL, [
+            Status.RUNNING, worker, now, Status.QUEUED, now, batch])
+        rows = cursor.fetchall()
+    return [
+        (job_id, task, json.loads(args), attempts)
+        for job_id, task, args, attempts in rows
+    ]
+
+
+def backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=BACKOFF_SECONDS * 2 ** (attempts - 1))
+
+
+def run(job_id: int, task: str, args: list, attempts: int) -> bool:
+    """Run a claimed job and record its outcome. True if it succeeded."""
+    current = _current.set(job_id)
+    try:
+        import_string(task)(*args)
+    except Exception:
+        error = traceback.format_exc()
+        retry = attempts < MAX_ATTEMPTS
+        Job.objects.filter(id=job_id).update(
+            status=Status.QUEUED if retry else Status.FAILED,
+            run_at=timezone.now() + backoff(attempts),
+            finished_at=None if retry else timezone.now(),
+            error=error)
+        if retry:
+            logger.warning(
+                "Job %s %s failed (attempt %s/%s)",
+                job_id, task, attempts, MAX_ATTEMPTS, exc_info=True)
+        else:
+            give_up(job_id, task)
+        return False
+    finally:
+        _current.reset(current)
+
+    Job.objects.filter(id=job_id).update(
+        status=Status.DONE, finished_at=timezone.now(), error='')
+    return True
+
+
+def give_up(job_id: int, task: str):
+    fallback = _fallbacks.get(task)
+    logger.error(
+        "Job %s %s failed %s times, giving up%s",
+        job_id, task, MAX_ATTEMPTS,
+        f", queued {task_name(fallback)}" if fallback else "",
+        exc_info=True)
+    if fallback:
+        enqueue(fallback, priority=Priority.HIGH)
+
+
+def run_job(job) -> bool:
+    """run() for a pool: takes a claimed (id, task, args, attempts) row."""
+    try:
+        return run(*job)
+    finally:
+        # Pool threads and processes outlive the job
+        connection.close_if_unusable_or_obsolete()
+
+
+def purge_done(older_than: timedelta) -> int:
+    """Delete jobs that succeeded more than older_than ago."""
+    return Job.objects.filter(
+        status=Status.DONE,
+        finished_at__lt=timezone.now() - older_than,
+    ).delete()[0]
+
+
+def stats(window: timedelta = timedelta(hours=1)) -> dict:
+    """
+    Queue depth per status and the latency of the jobs finished within
+    window: wait (due to claimed) and run (claimed to finished) times.
+    """
+    now = timezone.now()
+    depth = dict.fromkeys(Status.values, 0)
+    depth.update(
+        Job.objects.order_by().values_list('status').annotate(Count('id')))
+    oldest = Job.objects.filter(
+        status=Status.QUEUED, run_at__lte=now).aggregate(Min('run_at'))
+
+    def seconds(start, end):
+        return ExpressionWrapper(F(end) - F(start), DurationField())
+
+    latency = Job.objects.filter(
+        status=Status.DONE, finished_at__gte=now - window,
+    ).aggregate(
+        wait_avg=Avg(seconds('run_at', 'claimed_at')),
+        wait_max=Max(seconds('run_at', 'claimed_at')),
+        run_avg=Avg(seconds('claimed_at', 'finished_at')),
+        run_max=Max(seconds('claimed_at', 'finished_at')),
+    )
+    oldest = oldest['run_at__min']
+    return {
+        'depth': depth,
+        'oldest_due_seconds': (now - oldest).total_seconds() if oldest else 0,
+        **{
+            f'{name}_seconds': value.total_seconds() if value else 0
+            for name, value in latency.items()
+        },
+    }
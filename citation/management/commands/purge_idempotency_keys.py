@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from citation import idempotency
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete Idempotency-Keys older than IDEMPOTENCY['TTL'], in batches "
+        "of --batch rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch', type=int, default=idempotency.PURGE_BATCH)
+
+    def handle(self, *args, **options):
+        purged = idempotency.purge(options['batch'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Purged {purged} expired idempotency keys"))
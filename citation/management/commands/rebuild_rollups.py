@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from citation import rollups
+from citation.models import CitationRollup
+
+
+class Command(BaseCommand):
+    help = "Recompute the citation dashboard rollups from the raw citations."
+
+    def handle(self, *args, **options):
+        rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {CitationRollup.objects.count()} rollup rows"))
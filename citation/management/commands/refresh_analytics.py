@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from citation import analytics
+
+
+class Command(BaseCommand):
+    help = (
+        "Bring the columnar analytics snapshot up to date with the citation "
+        "changes, once or every --every seconds. --full rebuilds it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true')
+        parser.add_argument('--every', type=float, default=None)
+
+    def handle(self, *args, **options):
+        full = options['full']
+        while True:
+            started = time.perf_counter()
+            snapshot = analytics.refresh(full=full)
+            self.stdout.write(self.style.SUCCESS(
+                f"Snapshot of {len(snapshot)} citations at change "
+                f"{snapshot.seq} in {time.perf_counter() - started:.2f}s"))
+
+            if options['every'] is None:
+                return
+            full = False
+            time.sleep(options['every'])
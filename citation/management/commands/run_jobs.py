@@ -0,0 +1,70 @@
+from datetime import timedelta
+from multiprocessing.pool import ThreadPool
+import json
+import multiprocessing
+import os
+import socket
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from citation import jobs
+
+POOLS = {
+    'thread': ThreadPool,
+    'process': multiprocessing.get_context('fork').Pool,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background jobs on a thread or process pool, claiming "
+        "them in batches, until interrupted or, with --once, the queue is "
+        "empty. --stats prints the queue depth and job latency instead."
+    )
+
+    def add_arguments(self, parser):
+        config = getattr(settings, 'JOBS', {})
+        parser.add_argument(
+            '--workers', type=int, default=config.get('WORKERS', 4))
+        parser.add_argument(
+            '--pool', choices=POOLS, default=config.get('POOL', 'thread'))
+        parser.add_argument('--batch', type=int, default=jobs.BATCH)
+        parser.add_argument(
+            '--poll', type=float, default=config.get('POLL_SECONDS', 1),
+            help='Seconds to sleep when no job is due')
+        parser.add_argument(
+            '--keep-done', type=float,
+            default=config.get('KEEP_DONE_SECONDS', 24 * 60 * 60),
+            help='Seconds to keep succeeded jobs for the latency stats')
+        parser.add_argument('--once', action='store_true')
+        parser.add_argument('--stats', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(jobs.stats(), indent=2))
+            return
+
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        keep_done = timedelta(seconds=options['keep_done'])
+        # Workers start here and must open their own connections
+        connections.close_all()
+
+        with POOLS[options['pool']](options['workers']) as pool:
+            while True:
+                jobs.requeue_stale()
+                claimed = jobs.claim(worker, options['batch'])
+                if not claimed:
+                    jobs.purge_done(keep_done)
+                    if options['once']:
+                        return
+                    time.sleep(options['poll'])
+                    continue
+
+                started = time.perf_counter()
+                ok = sum(pool.map(jobs.run_job, claimed))
+                self.stdout.write(
+                    f"Ran {len(claimed)} jobs, {len(claimed) - ok} failed, "
+                    f"in {time.perf_counter() - started:.2f}s")
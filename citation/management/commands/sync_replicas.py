@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from citationapp.routers import PRIMARY
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database onto the read replicas with the "
+        "online backup API, once or every --every seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float, default=None)
+
+    def handle(self, *args, **options):
+        aliases = settings.READ_REPLICAS['ALIASES']
+        if not aliases:
+            raise CommandError("No replicas, set DATABASE_REPLICAS")
+
+        primary = connections[PRIMARY]
+        if primary.vendor != 'sqlite':
+            raise CommandError("Replicas can only be copied from SQLite")
+
+        while True:
+            started = time.perf_counter()
+            primary.ensure_connection()
+            for alias in aliases:
+                replica = connections[alias]
+                replica.ensure_connection()
+                primary.connection.backup(replica.connection)
+            self.stdout.write(self.style.SUCCESS(
+                f"Copied {primary.settings_dict['NAME']} to "
+                f"{len(aliases)} replicas in "
+                f"{time.perf_counter() - started:.2f}s"))
+
+            if options['every'] is None:
+                return
+            time.sleep(options['every'])
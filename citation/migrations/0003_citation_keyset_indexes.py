@@ -0,0 +1,21 @@
+# Generated by Django 4.1.5 on 2026-10-18 15:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citation', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='citation',
+            index=models.Index(fields=['citation_agency', 'issued_datetime', 'id'], name='citation_agency_issued_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='citation',
+            index=models.Index(fields=['officer', 'issued_datetime', 'id'], name='citation_officer_issued_idx'),
+        ),
+    ]
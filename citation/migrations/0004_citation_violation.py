@@ -0,0 +1,106 @@
+# Generated by Django 4.1.5 on 2026-10-18 15:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+VIOLATION_COLUMNS = [f'violation_{n}' for n in range(5)]
+# The default of the fixed columns, filling the ones a citation did not use
+PADDING = 'FTA'
+
+
+def used_codes(codes):
+    """The codes of a citation without the padding after the last one."""
+    codes = [code for code in codes if code]
+    while len(codes) > 1 and codes[-1] == PADDING:
+        codes.pop()
+    return codes
+
+
+def backfill_violations(apps, schema_editor):
+    """Copy violation_0..violation_4 into CitationViolation rows."""
+    Citation = apps.get_model('citation', 'Citation')
+    CitationViolation = apps.get_model('citation', 'CitationViolation')
+
+    batch = []
+    rows = Citation.objects.values_list('id', *VIOLATION_COLUMNS)
+    for citation_id, *codes in rows.iterator(chunk_size=2000):
+        codes = dict.fromkeys(used_codes(codes))
+        batch.extend(
+            CitationViolation(
+                citation_id=citation_id, position=position, code=code)
+            for position, code in enumerate(codes)
+        )
+        if len(batch) >= 2000:
+            CitationViolation.objects.bulk_create(batch)
+            batch = []
+    CitationViolation.objects.bulk_create(batch)
+
+
+def restore_violations(apps, schema_editor):
+    """Write the first five violation rows back into the fixed columns."""
+    Citation = apps.get_model('citation', 'Citation')
+    CitationViolation = apps.get_model('citation', 'CitationViolation')
+
+    violations = CitationViolation.objects.order_by('citation_id', 'position')
+    current, codes = None, []
+    for citation_id, code in violations.values_list('citation_id', 'code'):
+        if citation_id != current and current is not None:
+            _restore(Citation, current, codes)
+            codes = []
+        current = citation_id
+        codes.append(code)
+    if current is not None:
+        _restore(Citation, current, codes)
+
+
+def _restore(Citation, citation_id, codes):
+    columns = dict(zip(VIOLATION_COLUMNS, codes[:5]))
+    Citation.objects.filter(id=citation_id).update(**columns)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citation', '0003_citation_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CitationViolation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('code', models.CharField(choices=[('FTA', 'Failed to aid'), ('UNSF', 'Unsafe start from parked, stopped, standing')], max_length=255)),
+                ('citation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='violations', to='citation.citation')),
+            ],
+            options={
+                'ordering': ['position'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='citationviolation',
+            constraint=models.UniqueConstraint(fields=('code', 'citation'), name='citation_violation_code_uniq'),
+        ),
+        migrations.RunPython(backfill_violations, restore_violations),
+        migrations.RemoveField(
+            model_name='citation',
+            name='violation_0',
+        ),
+        migrations.RemoveField(
+            model_name='citation',
+            name='violation_1',
+        ),
+        migrations.RemoveField(
+            model_name='citation',
+            name='violation_2',
+        ),
+        migrations.RemoveField(
+            model_name='citation',
+            name='violation_3',
+        ),
+        migrations.RemoveField(
+            model_name='citation',
+            name='violation_4',
+        ),
+    ]
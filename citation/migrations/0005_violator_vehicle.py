@@ -0,0 +1,130 @@
+# Generated by Django 4.1.5 on 2026-10-18 15:51
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def backfill_identities(apps, schema_editor):
+    """Create Violator and Vehicle rows for existing citations."""
+    Citation = apps.get_model('citation', 'Citation')
+    Violator = apps.get_model('citation', 'Violator')
+    Vehicle = apps.get_model('citation', 'Vehicle')
+
+    violators = {}
+    vehicles = {}
+    rows = Citation.objects.order_by('id').values(
+        'oln_state', 'oln', 'violator_name', 'violator_dob',
+        'violator_address', 'violator_city', 'violator_state',
+        'violator_phone', 'violator_email', 'vehicle_vin', 'vehicle_type',
+        'vehicle_make', 'vehicle_model', 'vehicle_year', 'vehicle_color')
+    for row in rows.iterator(chunk_size=2000):
+        violators[(row['oln_state'], row['oln'])] = Violator(
+            oln_state=row['oln_state'],
+            oln=row['oln'],
+            name=row['violator_name'],
+            dob=row['violator_dob'],
+            address=row['violator_address'],
+            city=row['violator_city'],
+            state=row['violator_state'],
+            phone=row['violator_phone'],
+            email=row['violator_email'])
+        if row['vehicle_vin']:
+            vehicles[row['vehicle_vin']] = Vehicle(
+                vin=row['vehicle_vin'],
+                type=row['vehicle_type'],
+                make=row['vehicle_make'],
+                model=row['vehicle_model'],
+                year=row['vehicle_year'],
+                color=row['vehicle_color'])
+
+        if len(violators) + len(vehicles) >= 2000:
+            _flush(Violator, Vehicle, violators, vehicles)
+    _flush(Violator, Vehicle, violators, vehicles)
+
+    Citation.objects.update(
+        violator_id=Subquery(
+            Violator.objects
+            .filter(oln_state=OuterRef('oln_state'), oln=OuterRef('oln'))
+            .values('id')[:1]),
+        vehicle_id=Subquery(
+            Vehicle.objects
+            .filter(vin=OuterRef('vehicle_vin'))
+            .values('id')[:1]),
+    )
+
+
+def _flush(Violator, Vehicle, violators, vehicles):
+    Violator.objects.bulk_create(
+        violators.values(),
+        update_conflicts=True,
+        unique_fields=['oln_state', 'oln'],
+        update_fields=[
+            'name', 'dob', 'address', 'city', 'state', 'phone', 'email'])
+    Vehicle.objects.bulk_create(
+        vehicles.values(),
+        update_conflicts=True,
+        unique_fields=['vin'],
+        update_fields=['type', 'make', 'model', 'year', 'color'])
+    violators.clear()
+    vehicles.clear()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citation', '0004_citation_violation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Vehicle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vin', models.CharField(max_length=255, unique=True)),
+                ('type', models.CharField(blank=True, max_length=255)),
+                ('make', models.CharField(blank=True, max_length=255)),
+                ('model', models.CharField(blank=True, max_length=255)),
+                ('year', models.IntegerField(null=True)),
+                ('color', models.CharField(blank=True, max_length=255)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Violator',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('oln_state', models.CharField(choices=[('AL', 'Alabama'), ('AK', 'Alaska'), ('AS', 'American Samoa'), ('AZ', 'Arizona'), ('AR', 'Arkansas'), ('CA', 'California'), ('CO', 'Colorado'), ('CT', 'Connecticut'), ('DE', 'Delaware'), ('DC', 'District of Columbia'), ('FL', 'Florida'), ('GA', 'Georgia'), ('GU', 'Guam'), ('HI', 'Hawaii'), ('ID', 'Idaho'), ('IL', 'Illinois'), ('IN', 'Indiana'), ('IA', 'Iowa'), ('KS', 'Kansas'), ('KY', 'Kentucky'), ('LA', 'Louisiana'), ('ME', 'Maine'), ('MD', 'Maryland'), ('MA', 'Massachusetts'), ('MI', 'Michigan'), ('MN', 'Minnesota'), ('MS', 'Mississippi'), ('MO', 'Missouri'), ('MT', 'Montana'), ('NE', 'Nebraska'), ('NV', 'Nevada'), ('NH', 'New Hampshire'), ('NJ', 'New Jersey'), ('NM', 'New Mexico'), ('NY', 'New York'), ('NC', 'North Carolina'), ('ND', 'North Dakota'), ('MP', 'Northern Mariana Islands'), ('OH', 'Ohio'), ('OK', 'Oklahoma'), ('OR', 'Oregon'), ('PA', 'Pennsylvania'), ('PR', 'Puerto Rico'), ('RI', 'Rhode Island'), ('SC', 'South Carolina'), ('SD', 'South Dakota'), ('TN', 'Tennessee'), ('TX', 'Texas'), ('UT', 'Utah'), ('VT', 'Vermont'), ('VI', 'Virgin Islands'), ('VA', 'Virginia'), ('WA', 'Washington'), ('WV', 'West Virginia'), ('WI', 'Wisconsin'), ('WY', 'Wyoming')], max_length=2)),
+                ('oln', models.IntegerField()),
+                ('name', models.CharField(max_length=255)),
+                ('dob', models.DateTimeField(null=True)),
+                ('address', models.CharField(blank=True, max_length=255)),
+                ('city', models.CharField(blank=True, max_length=255)),
+                ('state', models.CharField(blank=True, choices=[('AL', 'Alabama'), ('AK', 'Alaska'), ('AS', 'American Samoa'), ('AZ', 'Arizona'), ('AR', 'Arkansas'), ('CA', 'California'), ('CO', 'Colorado'), ('CT', 'Connecticut'), ('DE', 'Delaware'), ('DC', 'District of Columbia'), ('FL', 'Florida'), ('GA', 'Georgia'), ('GU', 'Guam'), ('HI', 'Hawaii'), ('ID', 'Idaho'), ('IL', 'Illinois'), ('IN', 'Indiana'), ('IA', 'Iowa'), ('KS', 'Kansas'), ('KY', 'Kentucky'), ('LA', 'Louisiana'), ('ME', 'Maine'), ('MD', 'Maryland'), ('MA', 'Massachusetts'), ('MI', 'Michigan'), ('MN', 'Minnesota'), ('MS', 'Mississippi'), ('MO', 'Missouri'), ('MT', 'Montana'), ('NE', 'Nebraska'), ('NV', 'Nevada'), ('NH', 'New Hampshire'), ('NJ', 'New Jersey'), ('NM', 'New Mexico'), ('NY', 'New York'), ('NC', 'North Carolina'), ('ND', 'North Dakota'), ('MP', 'Northern Mariana Islands'), ('OH', 'Ohio'), ('OK', 'Oklahoma'), ('OR', 'Oregon'), ('PA', 'Pennsylvania'), ('PR', 'Puerto Rico'), ('RI', 'Rhode Island'), ('SC', 'South Carolina'), ('SD', 'South Dakota'), ('TN', 'Tennessee'), ('TX', 'Texas'), ('UT', 'Utah'), ('VT', 'Vermont'), ('VI', 'Virgin Islands'), ('VA', 'Virginia'), ('WA', 'Washington'), ('WV', 'West Virginia'), ('WI', 'Wisconsin'), ('WY', 'Wyoming')], max_length=2)),
+                ('phone', models.IntegerField(null=True)),
+                ('email', models.EmailField(blank=True, max_length=255)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='violator',
+            constraint=models.UniqueConstraint(fields=('oln_state', 'oln'), name='violator_license_uniq'),
+        ),
+        migrations.AddField(
+            model_name='citation',
+            name='vehicle',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='citations', to='citation.vehicle'),
+        ),
+        migrations.AddField(
+            model_name='citation',
+            name='violator',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='citations', to='citation.violator'),
+        ),
+        migrations.RunPython(backfill_identities, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='citation',
+            index=models.Index(fields=['violator', 'issued_datetime', 'id'], name='citation_violator_issued_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='citation',
+            index=models.Index(fields=['vehicle', 'issued_datetime', 'id'], name='citation_vehicle_issued_idx'),
+        ),
+    ]
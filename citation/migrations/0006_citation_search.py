@@ -0,0 +1,100 @@
+# Generated by Django 4.1.5 on 2026-10-18 16:02
+
+from django.db import migrations
+
+SEARCH_COLUMNS = (
+    'violator_name, violator_address, violation_route, '
+    'vehicle_make, vehicle_model'
+)
+
+NEW_VALUES = (
+    'new.id, new.violator_name, new.violator_address, new.violation_route, '
+    'new.vehicle_make, new.vehicle_model'
+)
+
+OLD_VALUES = (
+    "'delete', old.id, old.violator_name, old.violator_address, "
+    'old.violation_route, old.vehicle_make, old.vehicle_model'
+)
+
+CREATE_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE citation_search USING fts5(
+        {SEARCH_COLUMNS},
+        content='citation_citation',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER citation_search_insert
+    AFTER INSERT ON citation_citation BEGIN
+        INSERT INTO citation_search(rowid, {SEARCH_COLUMNS})
+        VALUES ({NEW_VALUES});
+    END
+    """,
+    f"""
+    CREATE TRIGGER citation_search_delete
+    AFTER DELETE ON citation_citation BEGIN
+        INSERT INTO citation_search(citation_search, rowid, {SEARCH_COLUMNS})
+        VALUES ({OLD_VALUES});
+    END
+    """,
+    f"""
+    CREATE TRIGGER citation_search_update
+    AFTER UPDATE OF {SEARCH_COLUMNS} ON citation_citation BEGIN
+        INSERT INTO citation_search(citation_search, rowid, {SEARCH_COLUMNS})
+        VALUES ({OLD_VALUES});
+        INSERT INTO citation_search(rowid, {SEARCH_COLUMNS})
+        VALUES ({NEW_VALUES});
+    END
+    """,
+    "INSERT INTO citation_search(citation_search) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS citation_search_update',
+    'DROP TRIGGER IF EXISTS citation_search_delete',
+    'DROP TRIGGER IF EXISTS citation_search_insert',
+    'DROP TABLE IF EXISTS citation_search',
+]
+
+
+def create_search(apps, schema_editor):
+    """The search index only exists on SQLite builds with FTS5."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+def restore_triggers(apps, schema_editor):
+    """
+    SQLite drops the triggers of a table Django rebuilds, as it does to
+    add or remove a column of citation_citation. Recreate them and
+    reindex the citations written since. Later migrations that rebuild the
+    table run this after it, both ways.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    # DROP_SQL ends with the table, CREATE_SQL starts with it
+    for sql in DROP_SQL[:-1] + CREATE_SQL[1:]:
+        schema_editor.execute(sql)
+
+
+def drop_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citation', '0005_violator_vehicle'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search, drop_search),
+    ]
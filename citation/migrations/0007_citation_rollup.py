@@ -0,0 +1,28 @@
+# Generated by Django 4.1.5 on 2026-10-18 15:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citation', '0006_citation_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CitationRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('agency', models.CharField(max_length=255)),
+                ('dimension', models.CharField(choices=[('total', 'Total'), ('county', 'County'), ('city', 'City'), ('violation', 'Violation'), ('factor', 'Factor')], max_length=20)),
+                ('day', models.DateField()),
+                ('value', models.CharField(max_length=255)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='citationrollup',
+            constraint=models.UniqueConstraint(fields=('agency', 'dimension', 'day', 'value'), name='citation_rollup_uniq'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.1.5 on 2026-10-18 16:18
+
+from importlib import import_module
+
+from django.db import migrations, models
+from django.db.models import F, Max
+from django.utils import timezone
+
+
+SEQUENCE = 'citations:sequence'
+
+restore_search_triggers = import_module(
+    'citation.migrations.0006_citation_search',
+).restore_triggers
+
+
+def backfill_change_seq(apps, schema_editor):
+    """Put existing citations in the change feed in id order."""
+    Citation = apps.get_model('citation', 'Citation')
+    CollectionVersion = apps.get_model('citation', 'CollectionVersion')
+
+    Citation.objects.update(change_seq=F('id'))
+    last = Citation.objects.aggregate(last=Max('change_seq'))['last']
+    CollectionVersion.objects.update_or_create(
+        name=SEQUENCE,
+        defaults={'version': last or 0, 'modified': timezone.now()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citation', '0008_collection_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CitationTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('citation_id', models.BigIntegerField()),
+                ('officer_id', models.BigIntegerField()),
+                ('change_seq', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        # Run last when reversed, after change_seq is dropped
+        migrations.RunPython(
+            migrations.RunPython.noop, restore_search_triggers),
+        migrations.AddField(
+            model_name='citation',
+            name='change_seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(
+            backfill_change_seq, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='citation',
+            index=models.Index(fields=['officer', 'change_seq'], name='citation_officer_change_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='citationtombstone',
+            index=models.Index(fields=['officer_id', 'change_seq'], name='tombstone_officer_change_idx'),
+        ),
+    ]
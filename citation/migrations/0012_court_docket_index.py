@@ -0,0 +1,17 @@
+# Generated by Django 4.1.5 on 2026-10-18 16:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citation', '0011_job'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='citation',
+            index=models.Index(fields=['court', 'court_appearance_date'], name='citation_court_docket_idx'),
+        ),
+    ]
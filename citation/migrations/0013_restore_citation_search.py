@@ -0,0 +1,20 @@
+from importlib import import_module
+
+from django.db import migrations
+
+# 0009 rebuilt citation_citation to add change_seq
+restore_search_triggers = import_module(
+    'citation.migrations.0006_citation_search',
+).restore_triggers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citation', '0012_court_docket_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            restore_search_triggers, restore_search_triggers),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 4.1.5 on 2026-10-18 16:32
+
+from importlib import import_module
+
+from django.db import migrations, models
+from django.db.models import Case, F, Value, When
+
+restore_search_triggers = import_module(
+    'citation.migrations.0006_citation_search',
+).restore_triggers
+
+FACTOR_FIELDS = [
+    'factor_crash',
+    'factor_passenger',
+    'factor_spanish',
+    'factor_car_cam',
+    'factor_body_cam',
+    'factor_school_zone',
+    'factor_construction',
+    'factor_workers',
+]
+
+
+def pack_factors(apps, schema_editor):
+    """Set bit n of factors for each FACTOR_FIELDS[n] that applies."""
+    Citation = apps.get_model('citation', 'Citation')
+    Citation.objects.update(factors=sum(
+        Case(When(**{name: True}, then=Value(1 << bit)), default=Value(0))
+        for bit, name in enumerate(FACTOR_FIELDS)
+    ))
+
+
+def unpack_factors(apps, schema_editor):
+    Citation = apps.get_model('citation', 'Citation')
+    for bit, name in enumerate(FACTOR_FIELDS):
+        Citation.objects.annotate(
+            bit=F('factors').bitand(1 << bit),
+        ).filter(bit__gt=0).update(**{name: True})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citation', '0013_restore_citation_search'),
+    ]
+
+    operations = [
+        # Run last when reversed, after the factor fields are restored
+        migrations.RunPython(
+            migrations.RunPython.noop, restore_search_triggers),
+        migrations.AddField(
+            model_name='citation',
+            name='factors',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(pack_factors, unpack_factors),
+        migrations.RemoveField(
+            model_name='citation',
+            name='factor_body_cam',
+        ),
+        migrations.RemoveField(
+            model_name='citation',
+            name='factor_car_cam',
+        ),
+        migrations.RemoveField(
+            model_name='citation',
+            name='factor_construction',
+        ),
+        migrations.RemoveField(
+            model_name='citation',
+            name='factor_crash',
+        ),
+        migrations.RemoveField(
+            model_name='citation',
+            name='factor_passenger',
+        ),
+        migrations.RemoveField(
+            model_name='citation',
+            name='factor_school_zone',
+        ),
+        migrations.RemoveField(
+            model_name='citation',
+            name='factor_spanish',
+        ),
+        migrations.RemoveField(
+            model_name='citation',
+            name='factor_workers',
+        ),
+        migrations.AddIndex(
+            model_name='citation',
+            index=models.Index(fields=['citation_agency', 'factors', 'issued_datetime', 'id'], name='citation_agency_factors_idx'),
+        ),
+        # SQLite rebuilt citation_citation to add and drop the columns
+        migrations.RunPython(
+            restore_search_triggers, restore_search_triggers),
+    ]
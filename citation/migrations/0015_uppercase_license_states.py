@@ -0,0 +1,47 @@
+from django.db import migrations
+from django.db.models import F
+from django.db.models.functions import Upper
+
+
+def uppercase_license_states(apps, schema_editor):
+    """
+    Upper case oln_state as link_identities now stores it, merging a
+    violator into the one already holding the upper case license.
+    """
+    Citation = apps.get_model('citation', 'Citation')
+    Violator = apps.get_model('citation', 'Violator')
+
+    lower = (
+        Violator.objects
+        .annotate(upper=Upper('oln_state'))
+        .exclude(oln_state=F('upper'))
+    )
+    for violator in lower.iterator():
+        existing = Violator.objects.filter(
+            oln_state=violator.upper, oln=violator.oln).first()
+        if existing:
+            Citation.objects.filter(violator=violator).update(
+                violator=existing)
+            violator.delete()
+        else:
+            violator.oln_state = violator.upper
+            violator.save(update_fields=['oln_state'])
+
+    (
+        Citation.objects
+        .annotate(upper=Upper('oln_state'))
+        .exclude(oln_state=F('upper'))
+        .update(oln_state=Upper('oln_state'))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citation', '0014_citation_factors'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            uppercase_license_states, migrations.RunPython.noop),
+    ]
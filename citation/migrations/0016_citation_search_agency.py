@@ -0,0 +1,75 @@
+from importlib import import_module
+
+from django.db import migrations
+
+previous = import_module('citation.migrations.0006_citation_search')
+
+# The agency is indexed too, so a search only ranks that agency's matches
+SEARCH_COLUMNS = f'{previous.SEARCH_COLUMNS}, citation_agency'
+
+NEW_VALUES = f'{previous.NEW_VALUES}, new.citation_agency'
+
+OLD_VALUES = f'{previous.OLD_VALUES}, old.citation_agency'
+
+CREATE_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE citation_search USING fts5(
+        {SEARCH_COLUMNS},
+        content='citation_citation',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER citation_search_insert
+    AFTER INSERT ON citation_citation BEGIN
+        INSERT INTO citation_search(rowid, {SEARCH_COLUMNS})
+        VALUES ({NEW_VALUES});
+    END
+    """,
+    f"""
+    CREATE TRIGGER citation_search_delete
+    AFTER DELETE ON citation_citation BEGIN
+        INSERT INTO citation_search(citation_search, rowid, {SEARCH_COLUMNS})
+        VALUES ({OLD_VALUES});
+    END
+    """,
+    f"""
+    CREATE TRIGGER citation_search_update
+    AFTER UPDATE OF {SEARCH_COLUMNS} ON citation_citation BEGIN
+        INSERT INTO citation_search(citation_search, rowid, {SEARCH_COLUMNS})
+        VALUES ({OLD_VALUES});
+        INSERT INTO citation_search(rowid, {SEARCH_COLUMNS})
+        VALUES ({NEW_VALUES});
+    END
+    """,
+    "INSERT INTO citation_search(citation_search) VALUES ('rebuild')",
+]
+
+DROP_SQL = previous.DROP_SQL
+
+
+def _execute(schema_editor, *statements):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def index_agency(apps, schema_editor):
+    _execute(schema_editor, *DROP_SQL, *CREATE_SQL)
+
+
+def unindex_agency(apps, schema_editor):
+    _execute(schema_editor, *DROP_SQL, *previous.CREATE_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citation', '0015_uppercase_license_states'),
+    ]
+
+    operations = [
+        migrations.RunPython(index_agency, unindex_agency),
+    ]
@@ -3,6 +3,79 @@ from datetime import datetime
 from user.models import Officer
 
 
+FACTOR_FIELDS = [
+    'factor_crash',
+    'factor_passenger',
+    'factor_spanish',
+    'factor_car_cam',
+    'factor_body_cam',
+    'factor_school_zone',
+    'factor_construction',
+    'factor_workers',
+]
+
+
+def factor_flag(name: str) -> property:
+    """Boolean view of the bit of a factor in Citation.factors."""
+    bit = 1 << FACTOR_FIELDS.index(name)
+
+    def getter(citation):
+        return bool(citation.factors & bit)
+
+    def setter(citation, value):
+        if value:
+            citation.factors |= bit
+        else:
+            citation.factors &= ~bit
+
+    return property(getter, setter)
+
+
+def factor_mask(factors: str) -> int:
+    """
+    Bits of a comma separated list of factor fields, ValueError for an
+    unknown one.
+    """
+    mask = 0
+    for name in filter(None, (f.strip() for f in factors.split(','))):
+        if name not in FACTOR_FIELDS:
+            raise ValueError(f"Unknown factor: {name}")
+        mask |= 1 << FACTOR_FIELDS.index(name)
+    return mask
+
+
+def citation_column(name: str):
+    """values_list() column of a Citation field or factor flag."""
+    if name not in FACTOR_FIELDS:
+        return name
+    return models.ExpressionWrapper(
+        models.F('factors')
+        .bitrightshift(FACTOR_FIELDS.index(name))
+        .bitand(1),
+        output_field=models.BooleanField())
+
+
+class CitationQuerySet(models.QuerySet):
+    def with_violation(self, code):
+        """Citations charged with code, looked up on the violation index."""
+        return self.filter(
+            id__in=CitationViolation.objects
+            .filter(code=code)
+            .values('citation_id'))
+
+    def with_factors(self, mask: int):
+        """
+        Citations with every factor of mask. Written as the list of factor
+        values including mask, so the factor index is searched for each.
+        """
+        if not mask:
+            return self
+        return self.filter(factors__in=[
+            value for value in range(1 << len(FACTOR_FIELDS))
+            if value & mask == mask
+        ])
+
+
 class Citation(models.Model):
     ONL_T = [
         ("EDL", "Enhanced Driver's License"),
@@ -114,19 +187,16 @@ class Citation(models.Model):
     vehicle_year = models.IntegerField(null=False)
     vehicle_make = models.CharField(max_length=255)
     vehicle_model = models.CharField(max_length=255)
-    factor_crash = models.BooleanField(choices=YES_NO, default=False)
-    factor_passenger = models.BooleanField(choices=YES_NO, default=False)
-    factor_spanish = models.BooleanField(choices=YES_NO, default=False)
-    factor_car_cam = models.BooleanField(choices=YES_NO, default=False)
-    factor_body_cam = models.BooleanField(choices=YES_NO, default=False)
-    factor_school_zone = models.BooleanField(choices=YES_NO, default=False)
-    factor_construction = models.BooleanField(choices=YES_NO, default=False)
-    factor_workers = models.BooleanField(choices=YES_NO, default=False)
-    violation_0 = models.CharField(max_length=255, choices=V_L, default="FTA")
-    violation_1 = models.CharField(max_length=255, choices=V_L, default="FTA")
-    violation_2 = models.CharField(max_length=255, choices=V_L, default="FTA")
-    violation_3 = models.CharField(max_length=255, choices=V_L, default="FTA")
-    violation_4 = models.CharField(max_length=255, choices=V_L, default="FTA")
+    # Bit n is set when FACTOR_FIELDS[n] applies
+    factors = models.PositiveSmallIntegerField(default=0)
+    factor_crash = factor_flag('factor_crash')
+    factor_passenger = factor_flag('factor_passenger')
+    factor_spanish = factor_flag('factor_spanish')
+    factor_car_cam = factor_flag('factor_car_cam')
+    factor_body_cam = factor_flag('factor_body_cam')
+    factor_school_zone = factor_flag('factor_school_zone')
+    factor_construction = factor_flag('factor_construction')
+    factor_workers = factor_flag('factor_workers')
     issued_by = models.CharField(max_length=255)
     officer = models.ForeignKey(Officer, on_delete=models.CASCADE)
     citation_agency = models.CharField(max_length=255)
@@ -134,6 +204,322 @@ class Citation(models.Model):
     court = models.CharField(max_length=255)
     court_appearance_date = models.DateTimeField(default=datetime.today)
     violator_signature = models.ImageField(upload_to="static/")
+    violator = models.ForeignKey(
+        'Violator',
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='citations')
+    vehicle = models.ForeignKey(
+        'Vehicle',
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='citations')
+    # Position in the change feed, see citation.sync
+    change_seq = models.BigIntegerField(default=0)
+
+    objects = CitationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['citation_agency', 'issued_datetime', 'id'],
+                name='citation_agency_issued_idx'),
+            models.Index(
+                fields=['officer', 'issued_datetime', 'id'],
+                name='citation_officer_issued_idx'),
+            models.Index(
+                fields=['violator', 'issued_datetime', 'id'],
+                name='citation_violator_issued_idx'),
+            models.Index(
+                fields=['vehicle', 'issued_datetime', 'id'],
+                name='citation_vehicle_issued_idx'),
+            models.Index(
+                fields=['officer', 'change_seq'],
+                name='citation_officer_change_idx'),
+            models.Index(
+                fields=['court', 'court_appearance_date'],
+                name='citation_court_docket_idx'),
+            models.Index(
+                fields=['citation_agency', 'factors', 'issued_datetime', 'id'],
+                name='citation_agency_factors_idx'),
+        ]
 
     def __str__(self):
         return self.violator_name
+
+
+class Violator(models.Model):
+    """
+    A driver identified by license state and number, holding the details
+    from the most recent citation. Citations keep their own as-issued copy.
+    """
+    oln_state = models.CharField(max_length=2, choices=Citation.ST)
+    oln = models.IntegerField()
+    name = models.CharField(max_length=255)
+    dob = models.DateTimeField(null=True)
+    address = models.CharField(max_length=255, blank=True)
+    city = models.CharField(max_length=255, blank=True)
+    state = models.CharField(max_length=2, choices=Citation.ST, blank=True)
+    phone = models.IntegerField(null=True)
+    email = models.EmailField(max_length=255, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['oln_state', 'oln'],
+                name='violator_license_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.oln_state} {self.oln}"
+
+
+class Vehicle(models.Model):
+    """A vehicle identified by VIN, see Violator."""
+    vin = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=255, blank=True)
+    make = models.CharField(max_length=255, blank=True)
+    model = models.CharField(max_length=255, blank=True)
+    year = models.IntegerField(null=True)
+    color = models.CharField(max_length=255, blank=True)
+
+    def __str__(self):
+        return self.vin
+
+
+VIOLATOR_FIELDS = {
+    'name': 'violator_name',
+    'dob': 'violator_dob',
+    'address': 'violator_address',
+    'city': 'violator_city',
+    'state': 'violator_state',
+    'phone': 'violator_phone',
+    'email': 'violator_email',
+}
+
+VEHICLE_FIELDS = {
+    'type': 'vehicle_type',
+    'make': 'vehicle_make',
+    'model': 'vehicle_model',
+    'year': 'vehicle_year',
+    'color': 'vehicle_color',
+}
+
+
+def link_identities(citations):
+    """
+    Upsert the Violator and Vehicle rows of unsaved citations and point
+    each citation at them. Later citations in the list win on conflicts.
+    License states are stored upper case, as they are looked up.
+    """
+    violators = {}
+    vehicles = {}
+    for citation in citations:
+        citation.oln_state = citation.oln_state.upper()
+        violators[(citation.oln_state, citation.oln)] = Violator(
+            oln_state=citation.oln_state,
+            oln=citation.oln,
+            **{f: getattr(citation, c) for f, c in VIOLATOR_FIELDS.items()})
+        if citation.vehicle_vin:
+            vehicles[citation.vehicle_vin] = Vehicle(
+                vin=citation.vehicle_vin,
+                **{f: getattr(citation, c) for f, c in VEHICLE_FIELDS.items()})
+
+    Violator.objects.bulk_create(
+        violators.values(),
+        update_conflicts=True,
+        unique_fields=['oln_state', 'oln'],
+        update_fields=list(VIOLATOR_FIELDS))
+    Vehicle.objects.bulk_create(
+        vehicles.values(),
+        update_conflicts=True,
+        unique_fields=['vin'],
+        update_fields=list(VEHICLE_FIELDS))
+
+    violator_ids = {
+        (state, oln): pk
+        for pk, state, oln in Violator.objects
+        .filter(oln__in={oln for _, oln in violators})
+        .values_list('id', 'oln_state', 'oln')
+    }
+    vehicle_ids = dict(
+        Vehicle.objects
+        .filter(vin__in=vehicles)
+        .values_list('vin', 'id'))
+
+    for citation in citations:
+        citation.violator_id = violator_ids.get(
+            (citation.oln_state, citation.oln))
+        citation.vehicle_id = vehicle_ids.get(citation.vehicle_vin)
+
+
+class CitationViolation(models.Model):
+    citation = models.ForeignKey(
+        Citation,
+        on_delete=models.CASCADE,
+        related_name='violations')
+    position = models.PositiveSmallIntegerField(default=0)
+    code = models.CharField(max_length=255, choices=Citation.V_L)
+
+    class Meta:
+        ordering = ['position']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['code', 'citation'],
+                name='citation_violation_code_uniq'),
+        ]
+
+    @classmethod
+    def for_citation(cls, citation, codes):
+        """
+        Unsaved violation rows for citation. codes are validated by
+        CitationSchema, a repeated one fails the unique constraint.
+        """
+        return [
+            cls(citation=citation, position=position, code=code)
+            for position, code in enumerate(codes)
+        ]
+
+    @classmethod
+    def codes_by_citation(cls, citation_ids) -> dict:
+        """Violation codes of each citation id, in position order."""
+        codes = {pk: [] for pk in citation_ids}
+        violations = (
+            cls.objects
+            .filter(citation_id__in=codes)
+            .order_by('citation_id', 'position')
+            .values_list('citation_id', 'code')
+        )
+        for citation_id, code in violations:
+            codes[citation_id].append(code)
+        return codes
+
+    def __str__(self):
+        return self.code
+
+
+class CitationTombstone(models.Model):
+    """
+    A deleted citation, kept in the change feed so officer devices syncing
+    with /sync drop it too. Plain ids, the rows they point at are gone.
+    """
+    citation_id = models.BigIntegerField()
+    officer_id = models.BigIntegerField()
+    change_seq = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['officer_id', 'change_seq'],
+                name='tombstone_officer_change_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.citation_id}@{self.change_seq}"
+
+
+class CitationRollup(models.Model):
+    """
+    Citation counts per agency, issue day and dimension value, kept up to
+    date by citation.rollups as citations are created and deleted.
+    """
+    class Dimension(models.TextChoices):
+        TOTAL = "total", 'Total'
+        COUNTY = "county", 'County'
+        CITY = "city", 'City'
+        VIOLATION = "violation", 'Violation'
+        FACTOR = "factor", 'Factor'
+
+    agency = models.CharField(max_length=255)
+    dimension = models.CharField(max_length=20, choices=Dimension.choices)
+    day = models.DateField()
+    value = models.CharField(max_length=255)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['agency', 'dimension', 'day', 'value'],
+                name='citation_rollup_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.agency} {self.day} {self.dimension}={self.value}"
+
+
+class CollectionVersion(models.Model):
+    """
+    Change counter of a collection, like an agency's citations or the
+    users, bumped by citation.versions on every write to it.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    modified = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name}@{self.version}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    An Idempotency-Key an officer sent with a citation, and the citation it
+    created, so a retry is answered without validating or writing again.
+    Expired keys are removed by the purge_idempotency_keys command.
+    """
+    officer = models.ForeignKey(Officer, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=40)
+    citation_id = models.BigIntegerField()
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['officer', 'key'],
+                name='idempotency_officer_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.key}->{self.citation_id}"
+
+
+class Job(models.Model):
+    """
+    Work deferred out of the request path, claimed and run in batches by
+    the run_jobs worker, see citation.jobs.
+    """
+    class Status(models.TextChoices):
+        QUEUED = 'queued'
+        RUNNING = 'running'
+        DONE = 'done'
+        FAILED = 'failed'
+
+    class Priority(models.IntegerChoices):
+        LOW = -10
+        NORMAL = 0
+        HIGH = 10
+
+    task = models.CharField(max_length=255)
+    args = models.JSONField(default=list)
+    priority = models.SmallIntegerField(
+        choices=Priority.choices, default=Priority.NORMAL)
+    status = models.CharField(
+        max_length=7, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=255, blank=True)
+    enqueued_at = models.DateTimeField(auto_now_add=True)
+    run_at = models.DateTimeField()
+    claimed_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['status', '-priority', 'run_at'],
+                name='job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} ({self.status})"
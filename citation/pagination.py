@@ -0,0 +1,97 @@
+"""
+Keyset (cursor) pagination for citation lists.
+"""
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from operator import attrgetter
+from typing import Any, List, Optional
+import json
+
+from django.db.models import Q, QuerySet
+from ninja import Field, Schema
+from ninja.conf import settings
+from ninja.errors import HttpError
+from ninja.pagination import PaginationBase
+
+
+def encode_cursor(issued_datetime: datetime, pk: int) -> str:
+    """Pack the (issued_datetime, id) of the last row into an opaque str."""
+    raw = json.dumps([issued_datetime.isoformat(), pk]).encode()
+    return urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Unpack a cursor produced by encode_cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        issued, pk = json.loads(urlsafe_b64decode(padded))
+        return datetime.fromisoformat(issued), int(pk)
+
+    except (ValueError, TypeError):
+        raise HttpError(400, "Invalid cursor")
+
+
+class CursorPagination(PaginationBase):
+    """
+    Seeks to the page after ``cursor`` ordered by (issued_datetime, id),
+    so every page costs the same regardless of its depth.
+
+    Passing ``offset`` falls back to limit/offset for older clients, which
+    keeps its total count; otherwise the count is only computed when
+    ``count=true``.
+    """
+    ordering = ("issued_datetime", "id")
+
+    class Input(Schema):
+        limit: int = Field(settings.PAGINATION_PER_PAGE, ge=1, le=1000)
+        cursor: Optional[str] = None
+        offset: Optional[int] = Field(None, ge=0)
+        count: bool = False
+
+    class Output(Schema):
+        items: List[Any]
+        next_cursor: Optional[str]
+        count: Optional[int]
+
+    def paginate_queryset(
+        self,
+        queryset: QuerySet,
+        pagination: Input,
+        **params: Any,
+    ) -> Any:
+        return self.paginate(
+            queryset, pagination, attrgetter("issued_datetime", "id"))
+
+    def paginate(self, queryset: QuerySet, pagination: Input, key) -> dict:
+        """
+        One page of queryset. ``key`` returns the (issued_datetime, id)
+        of an item, so values_list() rows can be paged as well as models.
+        """
+        limit = pagination.limit
+        queryset = queryset.order_by(*self.ordering)
+        page = queryset
+
+        if pagination.offset is not None:
+            page = page[pagination.offset:pagination.offset + limit + 1]
+
+        else:
+            if pagination.cursor:
+                issued, pk = decode_cursor(pagination.cursor)
+                page = page.filter(
+                    Q(issued_datetime__gt=issued) | Q(id__gt=pk),
+                    issued_datetime__gte=issued,
+                )
+            page = page[:limit + 1]
+
+        with_count = pagination.count or pagination.offset is not None
+        items = list(page)
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = encode_cursor(*key(items[-1]))
+
+        return {
+            "items": items,
+            "next_cursor": next_cursor,
+            "count": self._items_count(queryset) if with_count else None,
+        }
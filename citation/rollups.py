@@ -0,0 +1,135 @@
+"""
+Incrementally maintained citation counts for agency dashboards.
+
+Every citation contributes one to its agency/day for the total, its
+county, its city, each of its violation codes and each factor flag set.
+New citations are counted by a background job, see citation.jobs. A
+rebuild drops the jobs not applied yet, as it counts their citations, and
+one is queued if such a job fails for good.
+"""
+from collections import Counter
+from datetime import timezone
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import TruncDate
+
+from citation import jobs
+from citation.models import (
+    FACTOR_FIELDS, Citation, CitationRollup, CitationViolation, factor_mask)
+
+Dimension = CitationRollup.Dimension
+
+
+UPSERT_SQL = f"""
+    INSERT INTO {CitationRollup._meta.db_table}
+        (agency, dimension, day, value, count)
+    VALUES (%s, %s, %s, %s, %s)
+    ON CONFLICT (agency, dimension, day, value)
+    DO UPDATE SET count = count + excluded.count
+"""
+
+
+def _day(value):
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+def rollup_keys(citation, codes):
+    """Every (agency, dimension, day, value) a citation is counted in."""
+    agency = citation.citation_agency
+    day = _day(citation.issued_datetime)
+    keys = [
+        (Dimension.TOTAL, ''),
+        (Dimension.COUNTY, citation.violation_county),
+        (Dimension.CITY, citation.violation_city),
+    ]
+    keys += [(Dimension.VIOLATION, code) for code in dict.fromkeys(codes)]
+    keys += [
+        (Dimension.FACTOR, name)
+        for name in FACTOR_FIELDS if getattr(citation, name)
+    ]
+    return [(agency, str(dim), day, value) for dim, value in keys]
+
+
+def apply(deltas: Counter):
+    """Add deltas to the rollup rows in a single round trip."""
+    apply_rows([(*key, n) for key, n in deltas.items() if n])
+
+
+def apply_rows(rows: list):
+    """Add (agency, dimension, day, value, count) rows to the rollups."""
+    if rows:
+        with transaction.atomic():
+            # Skipped if a rebuild cancelled the job since it was claimed
+            if jobs.claimed():
+                with connection.cursor() as cursor:
+                    cursor.executemany(UPSERT_SQL, rows)
+
+
+def add_citations(citations):
+    """
+    Count (citation, violation codes) pairs that were just created, in a
+    background job queued with them.
+    """
+    deltas = Counter()
+    for citation, codes in citations:
+        deltas.update(rollup_keys(citation, codes))
+    rows = [
+        (agency, dimension, day.isoformat(), value, n)
+        for (agency, dimension, day, value), n in deltas.items() if n
+    ]
+    if rows:
+        jobs.enqueue(apply_rows, rows)
+
+
+def remove_citation(citation):
+    """Uncount a citation that is about to be deleted."""
+    codes = citation.violations.values_list('code', flat=True)
+    deltas = Counter()
+    deltas.subtract(rollup_keys(citation, list(codes)))
+    apply(deltas)
+
+
+def rebuild():
+    """Recompute every rollup row from the raw citation tables."""
+    citations = Citation.objects.annotate(
+        agency=F('citation_agency'),
+        day=TruncDate('issued_datetime'))
+    violations = CitationViolation.objects.annotate(
+        agency=F('citation__citation_agency'),
+        day=TruncDate('citation__issued_datetime'))
+
+    groups = [
+        (Dimension.TOTAL, citations, Value('')),
+        (Dimension.COUNTY, citations, F('violation_county')),
+        (Dimension.CITY, citations, F('violation_city')),
+        (Dimension.VIOLATION, violations, F('code')),
+    ]
+    groups += [
+        (Dimension.FACTOR, citations.with_factors(factor_mask(name)),
+         Value(name))
+        for name in FACTOR_FIELDS
+    ]
+
+    with transaction.atomic():
+        # First write, locking out writers: every citation committed until
+        # now is counted below, so the jobs counting them are dropped
+        jobs.cancel(apply_rows)
+        CitationRollup.objects.all().delete()
+        for dimension, queryset, value in groups:
+            rows = (
+                queryset
+                .annotate(value=value)
+                .values('agency', 'day', 'value')
+                .annotate(count=Count('id'))
+                .order_by()
+            )
+            CitationRollup.objects.bulk_create(
+                [CitationRollup(dimension=dimension, **row) for row in rows],
+                batch_size=1000,
+            )
+
+
+jobs.on_give_up(apply_rows, rebuild)
@@ -0,0 +1,58 @@
+"""
+Ranked full-text search over citations, backed by the citation_search
+SQLite FTS5 table that triggers keep in sync with citation_citation.
+"""
+import re
+
+from django.db import connection
+
+SEARCH_SQL = """
+    SELECT c.id
+    FROM citation_search
+    JOIN citation_citation c ON c.id = citation_search.rowid
+    WHERE citation_search MATCH %s
+    -- The match is on agency tokens, this keeps exact agencies only
+    AND c.citation_agency = %s
+    ORDER BY citation_search.rank
+    LIMIT %s
+"""
+
+
+# Columns free text is matched against, citation_agency only scopes it
+TEXT_COLUMNS = (
+    'violator_name', 'violator_address', 'violation_route', 'vehicle_make',
+    'vehicle_model',
+)
+
+
+def match_expression(q: str) -> str:
+    """
+    Turn free text into an FTS5 query where every word must match as a
+    prefix, so user input can never be a syntax error.
+    """
+    words = re.findall(r"\w+", q)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def agency_expression(agency: str, expression: str) -> str:
+    """
+    Limit expression to the agency's rows inside the FTS index, so rows of
+    other agencies are never ranked.
+    """
+    agency = agency.replace('"', '""')
+    return (
+        f'citation_agency : "{agency}" AND '
+        f'{{{" ".join(TEXT_COLUMNS)}}} : ({expression})'
+    )
+
+
+def search_citation_ids(agency: str, q: str, limit: int = 20) -> list:
+    """Ids of the agency citations best matching q, best first."""
+    expression = match_expression(q)
+    if not expression:
+        return []
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            SEARCH_SQL, [agency_expression(agency, expression), agency, limit])
+        return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,60 @@
+"""
+Signal handlers keeping derived citation tables consistent.
+"""
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save)
+from django.dispatch import receiver
+
+from citation import rollups, sync, versions
+from citation.models import Citation
+from user.models import User
+
+
+@receiver(pre_delete, sender=Citation)
+def uncount_citation(sender, instance, **kwargs):
+    """Remove a citation from the rollups before its violations cascade."""
+    rollups.remove_citation(instance)
+
+
+@receiver(pre_save, sender=Citation)
+def sequence_citation(sender, instance, raw=False, **kwargs):
+    """Move a citation to the head of the change feed as it is written."""
+    if not raw:
+        sync.stamp([instance])
+
+
+@receiver(post_delete, sender=Citation)
+def bury_citation(sender, instance, **kwargs):
+    """Keep a tombstone so synced devices drop the citation."""
+    sync.bury(instance)
+
+
+@receiver(post_save, sender=Citation)
+@receiver(post_delete, sender=Citation)
+def bump_citation_versions(sender, instance, **kwargs):
+    """Invalidate the conditional GETs of the lists holding a citation."""
+    versions.bump(*versions.citation_keys([instance]))
+
+
+# User fields the user lists show or filter on
+LISTED_USER_FIELDS = frozenset(
+    {'id', 'name', 'agency', 'email', 'badge', 'role'})
+
+
+@receiver(post_save)
+def bump_user_version(sender, instance, update_fields=None, **kwargs):
+    """
+    Invalidate the conditional GETs of the user lists, unless the save
+    only wrote fields they do not show, like the last_login of a login.
+    """
+    if not isinstance(instance, User):
+        return
+    if update_fields is None or LISTED_USER_FIELDS & update_fields:
+        versions.bump(versions.USERS)
+
+
+@receiver(post_delete)
+def bump_deleted_user_version(sender, instance, **kwargs):
+    """Invalidate the conditional GETs of the user lists."""
+    if isinstance(instance, User):
+        versions.bump(versions.USERS)
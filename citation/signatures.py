@@ -0,0 +1,129 @@
+"""
+Content-addressed storage of violator signature images.
+
+Uploads are streamed to disk while being hashed, so identical images are
+stored once under their SHA-256. The normalized rendition and thumbnail
+are produced by a background job, see citation.jobs.
+"""
+from hashlib import sha256
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+import os
+
+from django.conf import settings
+from PIL import Image, UnidentifiedImageError
+
+from citation import jobs
+
+CHUNK_SIZE = 64 * 1024
+
+_config = getattr(settings, 'SIGNATURES', {})
+ROOT = Path(_config.get('ROOT', settings.BASE_DIR / 'static' / 'signatures'))
+MAX_BYTES = _config.get('MAX_BYTES', 5 * 1024 * 1024)
+THUMBNAIL_SIZE = _config.get('THUMBNAIL_SIZE', (240, 120))
+
+
+class SignatureError(ValueError):
+    pass
+
+
+def signature_path(digest: str, suffix: str = '') -> Path:
+    return ROOT / digest[:2] / f"{digest}{suffix}"
+
+
+def signature_name(digest: str) -> str:
+    """Name stored in Citation.violator_signature for digest."""
+    return signature_path(digest).relative_to(settings.BASE_DIR).as_posix()
+
+
+def store_signature(chunks) -> tuple:
+    """
+    Write an iterable of byte chunks to content-addressed storage.
+
+    Returns (digest, created) where created is False when the same image
+    was already stored. Raises SignatureError for empty, oversized or
+    non-image uploads.
+    """
+    ROOT.mkdir(parents=True, exist_ok=True)
+    digest = sha256()
+    size = 0
+
+    with NamedTemporaryFile(dir=ROOT, delete=False) as tmp:
+        try:
+            for chunk in chunks:
+                size += len(chunk)
+                if size > MAX_BYTES:
+                    raise SignatureError(
+                        f"Signature larger than {MAX_BYTES} bytes")
+                digest.update(chunk)
+                tmp.write(chunk)
+
+            if not size:
+                raise SignatureError("Empty signature")
+
+            tmp.flush()
+            try:
+                with Image.open(tmp.name) as image:
+                    image.verify()
+                # verify() leaves the image unusable, open it again
+                with Image.open(tmp.name) as image:
+                    blank = is_blank(flatten(image))
+            except (UnidentifiedImageError, OSError, SyntaxError):
+                raise SignatureError("Signature is not an image")
+            if blank:
+                raise SignatureError("Signature is blank")
+
+        except BaseException:
+            os.unlink(tmp.name)
+            raise
+
+    digest = digest.hexdigest()
+    target = signature_path(digest)
+    if target.exists():
+        os.unlink(tmp.name)
+        return digest, False
+
+    target.parent.mkdir(exist_ok=True)
+    os.replace(tmp.name, target)
+    jobs.enqueue(render_signature, digest, priority=jobs.Priority.HIGH)
+    return digest, True
+
+
+def flatten(image: Image.Image) -> Image.Image:
+    """
+    Grayscale version of image, transparent areas white as on paper.
+    Signature pads upload dark strokes on a transparent background, which
+    a plain convert('L') turns all black.
+    """
+    if image.mode in ('RGBA', 'LA', 'PA', 'P') or 'transparency' in image.info:
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    return image.convert('L')
+
+
+def is_blank(image: Image.Image) -> bool:
+    """Whether a grayscale image is a single shade, with no strokes."""
+    low, high = image.getextrema()
+    return low == high
+
+
+def render_signature(digest: str):
+    """Write the grayscale PNG rendition and thumbnail of a signature."""
+    with Image.open(signature_path(digest)) as image:
+        image = flatten(image)
+        if is_blank(image):
+            raise SignatureError(f"Signature {digest} renders blank")
+        image.save(signature_path(digest, '.png'), optimize=True)
+        image.thumbnail(THUMBNAIL_SIZE)
+        image.save(signature_path(digest, '.thumb.png'), optimize=True)
+
+
+def request_chunks(request):
+    """Stream a raw request body without reading it all into memory."""
+    while True:
+        chunk = request.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
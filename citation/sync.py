@@ -0,0 +1,82 @@
+"""
+Change feed of an officer's citations, served by /sync.
+
+Every citation write takes the next value of a table-wide sequence into
+change_seq and every delete leaves a CitationTombstone with its own value.
+The sequence is advanced inside the writing transaction and SQLite runs
+one writer at a time, so values become visible in order: a device that
+has seen value n has seen every change before it.
+"""
+import json
+
+from django.db.models import BooleanField, Value
+
+from citation import versions
+from citation.models import Citation, CitationTombstone
+
+SEQUENCE = "citations:sequence"
+
+
+def stamp(citations):
+    """Give citations about to be written consecutive sequence values."""
+    citations = list(citations)
+    if not citations:
+        return
+    last = versions.advance(SEQUENCE, len(citations))
+    for seq, citation in enumerate(citations, last - len(citations) + 1):
+        citation.change_seq = seq
+
+
+def bury(citation):
+    """Record the deletion of a citation in the change feed."""
+    CitationTombstone.objects.create(
+        citation_id=citation.id,
+        officer_id=citation.officer_id,
+        change_seq=versions.advance(SEQUENCE))
+
+
+def changes(officer_id: int, since: int, limit: int) -> tuple:
+    """
+    Up to limit (change_seq, citation id, deleted) entries after since,
+    read from both feed indexes in one query, and whether more follow.
+    """
+    live = (
+        Citation.objects
+        .filter(officer_id=officer_id, change_seq__gt=since)
+        .values_list('change_seq', 'id', Value(False, BooleanField()))
+    )
+    gone = (
+        CitationTombstone.objects
+        .filter(officer_id=officer_id, change_seq__gt=since)
+        .values_list('change_seq', 'citation_id', Value(True, BooleanField()))
+    )
+    feed = list(live.union(gone, all=True).order_by('change_seq')[:limit + 1])
+    return feed[:limit], len(feed) > limit
+
+
+def render_changes(encoder, officer_id: int, since: int, limit: int) -> str:
+    """
+    The changes after since as JSON: the current state of changed
+    citations, the ids of deleted ones and the cursor to sync from next.
+    """
+    feed, more = changes(officer_id, since, limit)
+    changed = [pk for _, pk, deleted in feed if not deleted]
+
+    rows = []
+    if changed:
+        rows = list(
+            Citation.objects
+            .filter(id__in=changed)
+            .order_by('change_seq')
+            .values_list(*encoder.columns))
+
+    # An id both deleted and live was reused, the live row is newer
+    live = set(changed)
+    deleted = [pk for _, pk, gone in feed if gone and pk not in live]
+
+    return '{"items": [%s], "deleted": %s, "cursor": %d, "more": %s}' % (
+        ", ".join(encoder.encode_rows(rows)),
+        json.dumps(deleted),
+        feed[-1][0] if feed else since,
+        json.dumps(more),
+    )
@@ -0,0 +1,169 @@
+"""
+Version markers for conditional GETs of the citation and user lists.
+
+Every write to a collection bumps its CollectionVersion row in the same
+transaction. Responses derive their ETag and Last-Modified from that row,
+so a client whose copy is current gets a 304 after one indexed lookup,
+without the view's query or serialization running.
+"""
+from functools import wraps
+from hashlib import sha1
+from inspect import Parameter, iscoroutinefunction, signature
+
+from django.db import connection
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from citation.models import CollectionVersion
+
+USERS = "users"
+
+BUMP_SQL = f"""
+    INSERT INTO {CollectionVersion._meta.db_table} (name, version, modified)
+    VALUES (%s, 1, %s)
+    ON CONFLICT (name)
+    DO UPDATE SET version = version + 1, modified = excluded.modified
+"""
+
+ADVANCE_SQL = f"""
+    INSERT INTO {CollectionVersion._meta.db_table} (name, version, modified)
+    VALUES (%s, %s, %s)
+    ON CONFLICT (name)
+    DO UPDATE SET
+        version = version + excluded.version,
+        modified = excluded.modified
+    RETURNING version
+"""
+
+
+def agency_citations(agency: str) -> str:
+    return f"citations:agency:{agency}"
+
+
+def officer_citations(officer_id: int) -> str:
+    return f"citations:officer:{officer_id}"
+
+
+def citation_keys(citations) -> set:
+    """Every collection a list of citations belongs to."""
+    keys = set()
+    for citation in citations:
+        keys.add(agency_citations(citation.citation_agency))
+        keys.add(officer_citations(citation.officer_id))
+    return keys
+
+
+def bump(*keys):
+    """Mark collections as changed, in a single round trip."""
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        cursor.executemany(BUMP_SQL, [(key, now) for key in sorted(keys)])
+
+
+def advance(key: str, count: int = 1) -> int:
+    """Add count to the version of key and return the new version."""
+    with connection.cursor() as cursor:
+        cursor.execute(ADVANCE_SQL, [key, count, timezone.now()])
+        return cursor.fetchone()[0]
+
+
+def current(key: str) -> tuple:
+    """(version, modified) of a collection, (0, None) if never written."""
+    row = (
+        CollectionVersion.objects
+        .filter(name=key)
+        .values_list('version', 'modified')
+        .first()
+    )
+    return row or (0, None)
+
+
+async def acurrent(key: str) -> tuple:
+    """current() through the async ORM."""
+    row = await (
+        CollectionVersion.objects
+        .filter(name=key)
+        .values_list('version', 'modified')
+        .afirst()
+    )
+    return row or (0, None)
+
+
+def etag(request, key: str, version: int) -> str:
+    """Strong ETag of this request's representation at version of key."""
+    raw = f"{key}:{version}:{request.get_full_path()}".encode()
+    return quote_etag(sha1(raw).hexdigest())
+
+
+class Validators:
+    """The ETag and Last-Modified of a request at a collection version."""
+
+    def __init__(self, request, name: str, version: int, modified):
+        self.request = request
+        self.etag = etag(request, name, version)
+        self.last_modified = modified and int(modified.timestamp())
+
+    def not_modified(self) -> HttpResponse | None:
+        """The 304 (or 412) answering the request, None to run the view."""
+        return get_conditional_response(
+            self.request, etag=self.etag, last_modified=self.last_modified)
+
+    def apply(self, result, response: HttpResponse):
+        # ninja renders plain results into the injected response
+        target = result if isinstance(result, HttpResponse) else response
+        if target.status_code in (200, 304):
+            target.headers.setdefault('ETag', self.etag)
+            if self.last_modified:
+                target.headers.setdefault(
+                    'Last-Modified', http_date(self.last_modified))
+        return result
+
+
+def conditional(key):
+    """
+    Serve GETs conditionally on the collection named by ``key(request)``.
+
+    Like django.views.decorators.http.condition, but for ninja views, sync
+    or async: a matching If-None-Match or If-Modified-Since is answered
+    with 304 before the view runs, and successful responses carry ETag
+    and Last-Modified. ``key`` returning None skips the check.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def wrapper(request, *args, response: HttpResponse,
+                              **kwargs):
+                name = key(request)
+                if name is None:
+                    return await view(request, *args, **kwargs)
+
+                validators = Validators(request, name, *await acurrent(name))
+                result = validators.not_modified()
+                if result is None:
+                    result = await view(request, *args, **kwargs)
+                return validators.apply(result, response)
+        else:
+            @wraps(view)
+            def wrapper(request, *args, response: HttpResponse, **kwargs):
+                name = key(request)
+                if name is None:
+                    return view(request, *args, **kwargs)
+
+                validators = Validators(request, name, *current(name))
+                result = validators.not_modified()
+                if result is None:
+                    result = view(request, *args, **kwargs)
+                return validators.apply(result, response)
+
+        # Ask ninja for the response it will render plain results into
+        params = signature(view).parameters.values()
+        wrapper.__signature__ = signature(view).replace(parameters=[
+            *params,
+            Parameter('response', Parameter.KEYWORD_ONLY,
+                      annotation=HttpResponse),
+        ])
+        return wrapper
+
+    return decorator
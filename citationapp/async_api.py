@@ -0,0 +1,314 @@
+"""
+Async variants of the user and citation routes, mounted under /api/async/.
+
+Requests served from citationapp.asgi do not hold a worker thread while
+they wait on the database or on password hashing: queries go through the
+async ORM and blocking work is handed to sync_to_async. Filters, updates,
+conditional GETs and citation creation go through the same helpers as
+the sync routes, so both APIs answer alike.
+"""
+from functools import wraps
+from typing import List
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import check_password
+from django.db.utils import IntegrityError
+from django.http import Http404
+from django.urls import path
+from ninja import NinjaAPI, Query, Schema
+from ninja.pagination import LimitOffsetPagination
+from ninja.security.http import HttpBearer
+
+from citation import idempotency, versions
+from citation.models import Citation
+from citation.pagination import CursorPagination
+from citationapp.instrumentation import instrument_api, timed
+from citationapp.routers import read_primary
+from citationapp.urls import (
+    AccessToken,
+    AuthBearer,
+    CitationPage,
+    CitationSchema,
+    ClerkSchema,
+    IdempotentBearer,
+    LoginSchema,
+    OfficerSchema,
+    Replay,
+    getOfficerSchema,
+    getUserSchema,
+    citation_page,
+    clerk_agency_citations,
+    deleted_response,
+    filter_citations,
+    invalid_idempotency_key,
+    login_throttled,
+    officer_citations,
+    replay,
+    reused_idempotency_key,
+    submit_citation,
+    update_officer_fields,
+    updateOfficerSchema,
+    users_of_type,
+    users_version,
+)
+from user import throttle
+from user.models import User, Clerk, Officer
+
+async_api = NinjaAPI(
+    title='Citation (async)',
+    version="0.1.0",
+    urls_namespace='api-async',
+)
+async_api.add_exception_handler(Replay, replay)
+async_api.add_exception_handler(
+    idempotency.InvalidKey, invalid_idempotency_key)
+async_api.add_exception_handler(
+    idempotency.KeyReused, reused_idempotency_key)
+async_api.add_exception_handler(throttle.Throttled, login_throttled)
+
+
+class UserPage(Schema):
+    items: List[getUserSchema]
+    count: int
+
+
+def unauthorized(request):
+    return async_api.create_response(
+        request,
+        {"error": "Unauthorized"},
+        status=401)
+
+
+def bearer_auth(view):
+    """
+    Async counterpart of AuthBearer. Ninja runs auth callbacks
+    synchronously, so the token is checked inside the view instead.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        header = request.headers.get('Authorization', '')
+        scheme, _, token = header.partition(' ')
+        user = None
+        if scheme.lower() == HttpBearer.openapi_scheme:
+            with timed(request, 'auth'):
+                user = await AuthBearer.aget_current_user(token)
+        if not user:
+            return unauthorized(request)
+        request.auth = user
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+paginate_citations = sync_to_async(citation_page)
+
+
+# User routes ---------------------------------------------------------------
+
+
+@async_api.post('/create-clerk/')
+async def create_clerk_api(request, agency: str, payload: ClerkSchema):
+    """Create a new Clerk using email and password."""
+    try:
+        clerk = await sync_to_async(Clerk.objects.create_user)(
+            payload.email,
+            payload.password,
+            agency=agency,
+            is_staff=True,
+            name=payload.name,
+            role=User.Role.CLERK,
+        )
+
+    except IntegrityError:
+        return async_api.create_response(
+            request,
+            {"error": "Email already exists"},
+            status=409,
+        )
+
+    return {
+        "type": "clerk",
+        "id": clerk.id,
+        "email": clerk.email,
+        }
+
+
+@async_api.post('/create-officer/')
+async def create_officer_api(request, agency: str, payload: OfficerSchema):
+    """Create a new Officer using email and password."""
+    try:
+        officer = await sync_to_async(Officer.objects.create_user)(
+            payload.email,
+            payload.password,
+            agency=agency,
+            name=payload.name,
+            badge=payload.badge,
+            role=User.Role.OFFICER,
+        )
+
+    except IntegrityError:
+        return async_api.create_response(
+            request,
+            {"error": "Email already exists"},
+            status=409,
+        )
+
+    return {
+        "type": "officer",
+        "id": officer.id,
+        "email": officer.email,
+        }
+
+
+@async_api.post('/login')
+async def user_login(request, payload: LoginSchema):
+    """Login using email and password"""
+    await sync_to_async(throttle.check_login)(request, payload.email)
+    try:
+        with read_primary():
+            user = await User.objects.aget(email=payload.email)
+
+    except User.DoesNotExist:
+        return async_api.create_response(
+            request,
+            {"error": "User not found"},
+            status=404)
+
+    password = payload.password.get_secret_value()
+    if await sync_to_async(check_password)(password, user.password):
+        return await sync_to_async(AccessToken.create)(user)
+
+
+@async_api.get('/users', response=UserPage)
+@versions.conditional(users_version)
+async def get_users(
+    request,
+    type: str,
+    pagination: LimitOffsetPagination.Input = Query(...),
+):
+    """Lists all users based on type"""
+    users = users_of_type(type)
+    start, stop = pagination.offset, pagination.offset + pagination.limit
+    return {
+        "items": [user async for user in users[start:stop]],
+        "count": await users.acount(),
+    }
+
+
+@async_api.get('/users/{user_id}', response=getOfficerSchema)
+@versions.conditional(users_version)
+async def get_user(request, user_id: int):
+    """List a single user by id"""
+    try:
+        return await Officer.objects.aget(id=user_id)
+
+    except Officer.DoesNotExist:
+        return async_api.create_response(
+            request,
+            {"error": "User not found"},
+            status=404)
+
+
+@async_api.put('/officers/{officer_id}')
+@bearer_auth
+async def update_officer(
+    request,
+    officer_id: int,
+    payload: updateOfficerSchema,
+):
+    """Update Officer attributes"""
+    try:
+        officer = await Officer.objects.aget(id=officer_id)
+
+    except Officer.DoesNotExist:
+        return async_api.create_response(
+            request,
+            {"error": "User not found"},
+            status=404)
+
+    if (request.auth.role == "CLERK") or (request.auth.id == officer_id):
+        await sync_to_async(update_officer_fields)(officer, payload)
+        return async_api.create_response(
+                request,
+                {"message": "Updated successfully"},
+                status=204)
+
+    else:
+        return unauthorized(request)
+
+
+@async_api.delete('/users/{user_id}')
+async def delete_user(request, user_id: int):
+    """Delete a user by id"""
+    deleted, _ = await User.objects.filter(id=user_id).adelete()
+    if not deleted:
+        raise Http404("No User matches the given query.")
+
+    return deleted_response(request)
+
+
+# Citation routes -----------------------------------------------------------
+
+
+# A sync operation, run by ninja through sync_to_async: its retries have to
+# be answered by IdempotentBearer, before the body is validated, and ninja
+# runs auth callbacks synchronously
+@async_api.post("/citation/", auth=IdempotentBearer())
+def create(request, payload: CitationSchema):
+    """Create a Citation form"""
+    return submit_citation(request, payload)
+
+
+@async_api.get('/list_citations/', response=CitationPage)
+@bearer_auth
+@versions.conditional(clerk_agency_citations)
+async def get_citations(
+    request,
+    pagination: CursorPagination.Input = Query(...),
+    fields: str = None,
+    violation: str = None,
+    factors: str = None,
+):
+    """List all Agency Citations"""
+    if request.auth.role != "CLERK":
+        return unauthorized(request)
+
+    citations = filter_citations(
+        Citation.objects.filter(citation_agency=request.auth.agency),
+        violation, factors)
+    return await paginate_citations(citations, pagination, fields)
+
+
+@async_api.get('/list_officer_citations/', response=CitationPage)
+@bearer_auth
+@versions.conditional(officer_citations)
+async def get_officer_citations(
+    request,
+    pagination: CursorPagination.Input = Query(...),
+    fields: str = None,
+    violation: str = None,
+    factors: str = None,
+):
+    """List Citations made by the logged Officer"""
+    citations = filter_citations(
+        Citation.objects.filter(officer=request.auth), violation, factors)
+    return await paginate_citations(citations, pagination, fields)
+
+
+@async_api.delete("/citation/{citation_id}")
+@bearer_auth
+async def delete_citation(request, citation_id: int):
+    """Delete a Citation made by the logged Officer"""
+    citations = Citation.objects.filter(id=citation_id, officer=request.auth)
+    deleted, _ = await citations.adelete()
+    if not deleted:
+        return unauthorized(request)
+
+    return deleted_response(request)
+
+
+instrument_api(async_api)
+
+urlpatterns = [
+    path("", async_api.urls),
+]
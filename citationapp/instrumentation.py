@@ -0,0 +1,193 @@
+"""
+Per-request SQL and phase timing.
+
+RequestTimingMiddleware counts the queries and database time of every
+request. It also collects the auth and view phases recorded by AuthBearer
+and by instrument_api. The numbers go out as a Server-Timing header, and
+queries slower than SLOW_QUERY_MS are written to the
+citationapp.slow_queries logger. With REQUEST_TIMING['ENABLED'] off the
+middleware removes itself and the views are left unwrapped.
+
+The middleware is sync and async capable, so async views served by
+citationapp.asgi stay on the event loop. Connections belong to a thread and
+the queries of an async view run in the threads of sync_to_async, so every
+connection of every alias, replicas included, gets one permanent execute
+wrapper that times the query for the request of the current context.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+import asyncio
+import json
+import logging
+import re
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+slow_query_logger = logging.getLogger('citationapp.slow_queries')
+
+_config = getattr(settings, 'REQUEST_TIMING', {})
+ENABLED = _config.get('ENABLED', False)
+SLOW_QUERY_MS = _config.get('SLOW_QUERY_MS', 200)
+
+_current = ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    def __init__(self, request):
+        self.request = request
+        self.queries = 0
+        self.db = 0.0
+        self.phases = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.queries += 1
+            self.db += elapsed
+            if elapsed * 1000 >= SLOW_QUERY_MS:
+                self.log_slow_query(sql, elapsed)
+
+    def log_slow_query(self, sql, elapsed):
+        match = self.request.resolver_match
+        slow_query_logger.warning(json.dumps({
+            "route": match.route if match else self.request.path,
+            "method": self.request.method,
+            "ms": round(elapsed * 1000, 2),
+            "sql": normalize_sql(sql),
+        }))
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def header(self, total):
+        metrics = [
+            f'db;dur={self.db * 1000:.2f};desc="{self.queries} queries"'
+        ]
+        metrics += [
+            f'{phase};dur={seconds * 1000:.2f}'
+            for phase, seconds in self.phases.items()
+        ]
+        if 'view' in self.phases:
+            rest = total - self.phases['view'] - self.phases.get('auth', 0)
+            metrics.append(f'serialize;dur={max(rest, 0) * 1000:.2f}')
+        metrics.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(metrics)
+
+
+def normalize_sql(sql):
+    """Collapse whitespace, placeholders lists and literals of a query."""
+    sql = re.sub(r"\s+", " ", sql).strip()
+    sql = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    sql = re.sub(r"\b\d+\b", "?", sql)
+    sql = sql.replace("%s", "?")
+    return re.sub(r"\((?:\?, )+\?\)", "(...)", sql)
+
+
+@contextmanager
+def timed(request, phase):
+    """Add the time spent in the block to a phase of the request."""
+    timing = getattr(request, '_timing', None)
+    if timing is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(phase, time.perf_counter() - start)
+
+
+def time_query(execute, sql, params, many, context):
+    """Execute wrapper timing a query for the request being served."""
+    timing = _current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    return timing(execute, sql, params, many, context)
+
+
+def install(connection, **kwargs):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+@contextmanager
+def timed_queries(timing):
+    """Time the queries of the block, of this thread or sync_to_async's."""
+    for connection in connections.all(initialized_only=True):
+        install(connection)
+    token = _current.set(timing)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+class RequestTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        connection_created.connect(install, dispatch_uid='request-timing')
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        timing = request._timing = RequestTiming(request)
+        start = time.perf_counter()
+        with timed_queries(timing):
+            response = self.get_response(request)
+        response['Server-Timing'] = timing.header(time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        timing = request._timing = RequestTiming(request)
+        start = time.perf_counter()
+        with timed_queries(timing):
+            response = await self.get_response(request)
+        response['Server-Timing'] = timing.header(time.perf_counter() - start)
+        return response
+
+
+def _timed_view(view_func):
+    if asyncio.iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            with timed(request, 'view'):
+                return await view_func(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        with timed(request, 'view'):
+            return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def instrument_api(api):
+    """
+    Record the view phase of every operation of a NinjaAPI, so that the
+    rest of the request (response validation and rendering) can be
+    reported as the serialize phase.
+    """
+    if not ENABLED:
+        return
+    for _, router in api._routers:
+        for path_view in router.path_operations.values():
+            for operation in path_view.operations:
+                operation.view_func = _timed_view(operation.view_func)
@@ -0,0 +1,164 @@
+"""
+Primary/replica database routing.
+
+Each request reads from one of the DATABASE_REPLICAS, picked at random,
+and writes go to the default database. Once a request writes, its later
+reads go to the primary too, and so do the requests of the same user for
+the next READ_REPLICAS['PIN_SECONDS'], so an officer sees the citation they
+just submitted while the replicas catch up. Code running outside a request
+(management commands, the shell) always uses the primary.
+
+Users are pinned by the subject of their bearer token and by the users a
+request saves, so a signup or a login pins the requests made with the new
+token. The pins live in the READ_REPLICAS['CACHE'] alias, which has to be
+shared by every worker process.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from hashlib import sha1
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from jwt import PyJWTError, decode
+
+PRIMARY = 'default'
+
+_config = getattr(settings, 'READ_REPLICAS', {})
+REPLICAS = _config.get('ALIASES', [])
+PIN_SECONDS = _config.get('PIN_SECONDS', 5)
+CACHE = _config.get('CACHE', 'default')
+
+_replica = ContextVar('replica', default=None)
+_pinned = ContextVar('pinned', default=False)
+_wrote = ContextVar('wrote', default=False)
+_subject = ContextVar('subject', default=None)
+_written_users = ContextVar('written_users', default=None)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _pinned.get() or _wrote.get():
+            return PRIMARY
+        return _replica.get()
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        users = _written_users.get()
+        if users is not None:
+            if _subject.get():
+                users.add(_subject.get())
+            instance = hints.get('instance')
+            if isinstance(instance, get_user_model()):
+                users.add(instance.email)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of the primary, see sync_replicas
+        return db == PRIMARY
+
+
+@contextmanager
+def read_primary():
+    """Send the reads of the block to the primary."""
+    pinned = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(pinned)
+
+
+def token_subject(request) -> str | None:
+    """Email the bearer token of the request was issued to, if valid."""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer':
+        return None
+    try:
+        return decode(token, settings.SECRET_KEY, algorithms=['HS256'])['sub']
+    except (PyJWTError, KeyError):
+        return None
+
+
+def pin_key(email: str) -> str:
+    return f"replica-pin:{sha1(email.encode()).hexdigest()}"
+
+
+def shared_cache():
+    """The pin cache, refusing one private to the process."""
+    try:
+        cache = caches[CACHE]
+    except Exception as exc:
+        raise ImproperlyConfigured(
+            f"READ_REPLICAS['CACHE'] {CACHE!r} is not a usable cache") from exc
+    if isinstance(cache, (LocMemCache, DummyCache)):
+        raise ImproperlyConfigured(
+            "Read replicas need READ_REPLICAS['CACHE'] to be shared by "
+            f"every process, {CACHE!r} is {type(cache).__name__}")
+    return cache
+
+
+@contextmanager
+def routing(subject: str | None, pinned: bool):
+    """
+    Route the request to a random replica, or to the primary if pinned.
+    Yields the emails of the users to pin once it is served: those it
+    saved, and the token subject if it wrote anything.
+    """
+    written = set()
+    replica = _replica.set(random.choice(REPLICAS))
+    pinned = _pinned.set(pinned)
+    wrote = _wrote.set(False)
+    subject = _subject.set(subject)
+    users = _written_users.set(written)
+    try:
+        yield written
+    finally:
+        _written_users.reset(users)
+        _subject.reset(subject)
+        _wrote.reset(wrote)
+        _pinned.reset(pinned)
+        _replica.reset(replica)
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not REPLICAS:
+            raise MiddlewareNotUsed
+        self.cache = shared_cache()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        subject = token_subject(request)
+        pinned = bool(subject and self.cache.get(pin_key(subject)))
+        with routing(subject, pinned) as written:
+            response = self.get_response(request)
+            if written:
+                self.cache.set_many(
+                    dict.fromkeys(map(pin_key, written), True), PIN_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        subject = token_subject(request)
+        pinned = bool(subject and await self.cache.aget(pin_key(subject)))
+        with routing(subject, pinned) as written:
+            response = await self.get_response(request)
+            if written:
+                await self.cache.aset_many(
+                    dict.fromkeys(map(pin_key, written), True), PIN_SECONDS)
+        return response
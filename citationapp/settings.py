@@ -60,7 +60,95 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
 }
 
+# Set REDIS_URL to share the default cache between worker processes
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+if os.environ.get('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+
+# Authenticated user cache used by AuthBearer, TTL in seconds. Each process
+# keeps its own: a user changed in another one stays cached for up to TTL
+# seconds, unless SHARED names a Django cache alias all processes share
+USER_CACHE = {
+    'MAX_SIZE': 1024,
+    'TTL': 60,
+    'SHARED': None,
+}
+
+# Content-addressed violator signature storage, see citation.signatures
+SIGNATURES = {
+    'ROOT': BASE_DIR / 'static' / 'signatures',
+    'MAX_BYTES': 5 * 1024 * 1024,
+    'THUMBNAIL_SIZE': (240, 120),
+}
+
+# Columnar citation snapshot for heatmaps, see citation.analytics
+ANALYTICS = {
+    'ROOT': BASE_DIR / 'analytics',
+    'CHUNK_SIZE': 50_000,
+}
+
+# Background jobs run by manage.py run_jobs, see citation.jobs
+JOBS = {
+    'WORKERS': 4,
+    'POOL': 'thread',
+    'BATCH': 20,
+    'POLL_SECONDS': 1,
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_SECONDS': 2,
+    'TIMEOUT_SECONDS': 300,
+    'KEEP_DONE_SECONDS': 24 * 60 * 60,
+}
+
+# Idempotency-Key retention for citation creation, see citation.idempotency
+IDEMPOTENCY = {
+    'TTL': 24 * 60 * 60,
+    'PURGE_BATCH': 1000,
+}
+
+# Token buckets for /login attempts per client IP and per email, see
+# user.throttle. Use user.throttle.CacheStore to share them between processes
+LOGIN_THROTTLE = {
+    'ENABLED': True,
+    'STORE': 'user.throttle.MemoryStore',
+    'OPTIONS': {},
+    'IP': {'BURST': 20, 'PER_MINUTE': 30},
+    'EMAIL': {'BURST': 5, 'PER_MINUTE': 5},
+}
+
+# Server-Timing headers and slow-query log, see citationapp.instrumentation
+REQUEST_TIMING = {
+    'ENABLED': os.environ.get('REQUEST_TIMING', '1') == '1',
+    'SLOW_QUERY_MS': 200,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'citationapp.slow_queries': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 MIDDLEWARE = [
+    'citationapp.instrumentation.RequestTimingMiddleware',
+    'citationapp.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -98,9 +186,65 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'citationapp.sqlite3',
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# SQLite tuning applied by citationapp.sqlite to every new connection.
+# "production" uses WAL so readers do not block behind writers, waits up to
+# busy_timeout ms for the write lock instead of failing with "database is
+# locked" and keeps connections open between requests. "default" restores
+# SQLite's own journal and sync modes with a connection per request.
+SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'production')
+
+SQLITE_PROFILES = {
+    'default': {
+        'CONN_MAX_AGE': 0,
+        'PRAGMAS': {
+            'journal_mode': 'delete',
+            'synchronous': 'full',
+        },
+    },
+    'production': {
+        'CONN_MAX_AGE': 600,
+        'PRAGMAS': {
+            'journal_mode': 'wal',
+            'busy_timeout': 5000,
+            'synchronous': 'normal',
+            'mmap_size': 256 * 1024 * 1024,
+            'cache_size': -64 * 1024,
+        },
+    },
+}
+
+SQLITE = SQLITE_PROFILES[SQLITE_PROFILE]
+DATABASES['default']['CONN_MAX_AGE'] = SQLITE['CONN_MAX_AGE']
+
+# Read replicas: a comma separated list of database files refreshed from the
+# primary, e.g. by the sync_replicas command. citationapp.routers sends
+# request reads to them, pinning a user to the primary for PIN_SECONDS
+# after they write. The pins are kept in the CACHE alias, which every worker
+# process must share: replicas are refused with a per-process memory cache.
+DATABASE_REPLICAS = [
+    name for name in os.environ.get('DATABASE_REPLICAS', '').split(',')
+    if name
+]
+
+for n, name in enumerate(DATABASE_REPLICAS):
+    DATABASES[f'replica{n}'] = {
+        **DATABASES['default'],
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
     }
+
+READ_REPLICAS = {
+    'ALIASES': [f'replica{n}' for n in range(len(DATABASE_REPLICAS))],
+    'PIN_SECONDS': int(os.environ.get('REPLICA_PIN_SECONDS', 5)),
+    'CACHE': 'default',
 }
 
+DATABASE_ROUTERS = ['citationapp.routers.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
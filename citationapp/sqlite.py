@@ -0,0 +1,23 @@
+"""
+Per-connection SQLite tuning.
+
+SQLite pragmas other than journal_mode only last for the connection that
+set them, so the pragmas of the SQLITE profile are applied every time
+Django opens a connection.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def pragmas() -> dict:
+    return getattr(settings, 'SQLITE', {}).get('PRAGMAS', {})
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """Apply the profile pragmas to a new SQLite connection."""
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in pragmas().items():
+        connection.connection.execute(f"PRAGMA {name} = {value}")
@@ -1,19 +1,40 @@
 from django.contrib import admin
-from django.urls import path
-from ninja import NinjaAPI, Schema
+from django.urls import include, path
+from ninja import Field, File, NinjaAPI, Query, Schema, UploadedFile
+from ninja.errors import HttpError
 from ninja.pagination import paginate
 from ninja.security import HttpBearer
 from django.contrib.auth.hashers import check_password
 from jwt import encode, PyJWTError, decode
 from django.conf import settings
 from django.shortcuts import get_object_or_404
-from datetime import timedelta, datetime
-from pydantic import SecretStr
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from datetime import date, timedelta, datetime
+from pydantic import SecretStr, validator
 from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Sum
 from django.db.utils import IntegrityError
-from typing import List
-
-from citation.models import Citation
+from django.utils import timezone
+from typing import List, Optional
+
+from citation import (
+    analytics, dockets, idempotency, rollups, sync, versions)
+from citation.bulk import bulk_create_citations, parse_rows
+from citation.export import CONTENT_TYPES, STREAMS
+from citation.models import (
+    Citation, CitationRollup, CitationViolation, IdempotencyKey,
+    factor_mask, link_identities)
+from citation.pagination import CursorPagination
+from citation.search import search_citation_ids
+from citation.serializers import (
+    CitationEncoder, projected_encoder, selected_fields)
+from citation.signatures import (
+    SignatureError, request_chunks, signature_name, store_signature)
+from citationapp.instrumentation import instrument_api, timed
+from citationapp.routers import read_primary
+from user import throttle
+from user.cache import user_cache
 from user.models import User, Clerk, Officer
 
 
@@ -23,7 +44,8 @@ class TokenPayload(Schema):
 
 class AuthBearer(HttpBearer):
     def authenticate(self, request, token: str) -> User:
-        user = self.get_current_user(token)
+        with timed(request, 'auth'):
+            user = self.get_current_user(token)
         if user:
             return user
 
@@ -38,7 +60,30 @@ class AuthBearer(HttpBearer):
 
         except PyJWTError:
             return None
-        user = get_object_or_404(User, email=payload['sub'])
+        user = user_cache.get(payload['sub'])
+        if user is None:
+            user = get_object_or_404(User, email=payload['sub'])
+            user_cache.set(payload['sub'], user)
+        return user
+
+    @staticmethod
+    async def aget_current_user(token: str) -> User | None:
+        """Check auth user without blocking the event loop"""
+        try:
+            payload = decode(
+                token,
+                settings.SECRET_KEY,
+                algorithms=['HS256'])
+
+        except PyJWTError:
+            return None
+        user = user_cache.get(payload['sub'])
+        if user is None:
+            try:
+                user = await User.objects.aget(email=payload['sub'])
+            except User.DoesNotExist:
+                raise Http404("No User matches the given query.")
+            user_cache.set(payload['sub'], user)
         return user
 
 # Django Ninja AccessToken --------------------------------------------------
@@ -53,7 +98,8 @@ class AccessToken:
             data={"sub": email},
             expires_delta=access_token_expires,
         )
-        user.save()
+        user.last_login = timezone.now()
+        user.save(update_fields=['last_login'])
         return {
             "email": email,
             "access_token": token,
@@ -70,6 +116,29 @@ class AccessToken:
         return encoded_jwt
 
 
+class Replay(Exception):
+    """A retried request, answered with the citation it created before."""
+    def __init__(self, citation_id: int):
+        self.citation_id = citation_id
+
+
+class IdempotentBearer(AuthBearer):
+    """
+    AuthBearer of citation creation. Ninja authenticates before it parses
+    the body, so a repeated Idempotency-Key is answered from here without
+    validating the citation again.
+    """
+    def authenticate(self, request, token: str) -> User:
+        user = super().authenticate(request, token)
+        if user and user.role != "CLERK":
+            request.auth = user
+            key = idempotency.request_key(request)
+            citation_id = key and idempotency.lookup(key)
+            if citation_id:
+                raise Replay(citation_id)
+        return user
+
+
 api = NinjaAPI(
     auth=AuthBearer(),
     title='Citation',
@@ -153,11 +222,7 @@ class CitationSchema(Schema):
     factor_school_zone: bool
     factor_construction: bool
     factor_workers: bool
-    violation_0: str
-    violation_1: str
-    violation_2: str
-    violation_3: str
-    violation_4: str
+    violations: List[str] = Field(..., min_items=1)
     issued_by: str
     citation_agency: str
     issued_datetime: datetime
@@ -165,6 +230,15 @@ class CitationSchema(Schema):
     court_appearance_date: datetime
     violator_signature: str
 
+    @validator('violations')
+    def known_violations(cls, codes):
+        unknown = sorted(set(codes) - set(dict(Citation.V_L)))
+        if unknown:
+            raise ValueError(f"Unknown violation: {', '.join(unknown)}")
+        if len(set(codes)) != len(codes):
+            raise ValueError("Repeated violation")
+        return codes
+
 
 class getCitationSchema(Schema):
     id: int
@@ -202,17 +276,72 @@ class getCitationSchema(Schema):
     factor_school_zone: bool
     factor_construction: bool
     factor_workers: bool
-    violation_0: str
-    violation_1: str
-    violation_2: str
-    violation_3: str
-    violation_4: str
+    violations: List[str]
     issued_by: str
     citation_agency: str
     issued_datetime: datetime
     court: str
     court_appearance_date: datetime
-    violator_signature: str
+    # Empty when no signature was uploaded, rendered as null
+    violator_signature: Optional[str]
+
+    @staticmethod
+    def resolve_violations(obj):
+        return [violation.code for violation in obj.violations.all()]
+
+
+class CitationPage(Schema):
+    items: List[getCitationSchema]
+    next_cursor: Optional[str]
+    count: Optional[int]
+
+
+class SyncPage(Schema):
+    items: List[getCitationSchema]
+    deleted: List[int]
+    cursor: int
+    more: bool
+
+
+class DocketEntry(Schema):
+    id: int
+    violator_name: str
+    oln_state: str
+    oln: int
+    officer_id: int
+    violations: List[str]
+
+
+class DocketSlot(Schema):
+    time: datetime
+    citations: List[DocketEntry]
+
+
+class Docket(Schema):
+    court: str
+    date: date
+    count: int
+    slots: List[DocketSlot]
+
+
+citation_encoder = CitationEncoder(getCitationSchema)
+
+
+def citation_page(citations, pagination, fields=None) -> HttpResponse:
+    """
+    Render a CitationPage straight from values_list() rows, skipping model
+    instances and schema validation. Same bytes as the validated response.
+
+    ``fields`` limits the items, and the selected columns, to a comma
+    separated list of getCitationSchema fields or to a view like summary.
+    """
+    encoder = citation_encoder
+    if fields:
+        encoder = projected_encoder(
+            getCitationSchema, selected_fields(getCitationSchema, fields))
+    return HttpResponse(
+        encoder.render_page(citations, pagination),
+        content_type=api.get_content_type())
 
 # User routes ---------------------------------------------------------------
 
@@ -307,12 +436,43 @@ def create_officer_api(request, agency: str, payload: OfficerSchema):
         }
 
 
+@api.exception_handler(throttle.Throttled)
+def login_throttled(request, exc):
+    response = api.create_response(
+        request,
+        {"error": "Too many login attempts"},
+        status=429)
+    response['Retry-After'] = exc.header()
+    return response
+
+
+def users_version(request) -> str:
+    return versions.USERS
+
+
+def users_of_type(type: str):
+    """Users of a role, by role name in any case, in id order."""
+    return User.objects.filter(role=type.upper()).order_by('id')
+
+
+def update_officer_fields(officer: Officer, payload: updateOfficerSchema):
+    """Apply an update to officer, changing the password only if sent."""
+    officer.name = payload.name
+    officer.badge = payload.badge
+    if payload.password:
+        officer.set_password(payload.password)
+    officer.save()
+
+
 # Login
 @api.post('/login', auth=None)
 def user_login(request, payload: LoginSchema):
     """Login using email and password"""
+    throttle.check_login(request, payload.email)
     try:
-        user = User.objects.get(email=payload.email)
+        # A user who just signed up may not be on the replicas yet
+        with read_primary():
+            user = User.objects.get(email=payload.email)
 
     except Exception:
         return api.create_response(
@@ -326,23 +486,16 @@ def user_login(request, payload: LoginSchema):
 
 # List all users
 @api.get('/users', response=List[getUserSchema], auth=None)
+@versions.conditional(users_version)
 @paginate
 def get_users(request, type: str):
     """Lists all users based on type"""
-    if type == 'admin':
-        all_users = User.objects.filter(role='ADMIN')
-
-    if type == 'clerk':
-        all_users = Clerk.objects.filter(role='CLERK')
-
-    if type == 'officer':
-        all_users = Officer.objects.filter(role='OFFICER')
-
-    return all_users
+    return users_of_type(type)
 
 
 # List Officer by id
 @api.get('/users/{user_id}', response=getOfficerSchema, auth=None)
+@versions.conditional(users_version)
 def get_user(request, user_id: int):
     """List a single user by id"""
     try:
@@ -356,6 +509,20 @@ def get_user(request, user_id: int):
             status=404)
 
 
+# Authenticated user cache counters
+@api.get('/cache/users')
+def user_cache_stats(request):
+    """Hit/miss counters of the authenticated user cache"""
+    if request.auth.role == "ADMIN":
+        return user_cache.stats()
+
+    else:
+        return api.create_response(
+            request,
+            {"error": "Unauthorized"},
+            status=401)
+
+
 # Update Officer
 @api.put('/officers/{officer_id}')
 def update_officer(request, officer_id: int, payload: updateOfficerSchema):
@@ -363,12 +530,7 @@ def update_officer(request, officer_id: int, payload: updateOfficerSchema):
     officer = get_object_or_404(Officer, id=officer_id)
 
     if (request.auth.role == "CLERK") or (request.auth.id == officer_id):
-
-        for attr, value in payload.dict().items():
-            setattr(officer, attr, value)
-            if payload.password:
-                officer.set_password(payload.password)
-        officer.save()
+        update_officer_fields(officer, payload)
         return api.create_response(
                 request,
                 {"message": "Updated successfully"},
@@ -381,24 +543,237 @@ def update_officer(request, officer_id: int, payload: updateOfficerSchema):
             status=401)
 
 
+def deleted_response(request):
+    """Answer of the delete routes of both APIs."""
+    return api.create_response(
+            request,
+            {"message": "Deleted successfully"},
+            status=204)
+
+
 # Delete user
 @api.delete('/users/{user_id}', auth=None)
 def delete_user(request, user_id: int):
     """Delete a user by id"""
     user = get_object_or_404(User, id=user_id)
     user.delete()
-    return api.create_response(
-            request,
-            {"message": "Deleted successfully"},
-            status=204)
+    return deleted_response(request)
 
 # Citation routes -----------------------------------------------------------
 
 
+def citation_form(officer: Officer, payload: CitationSchema) -> dict:
+    """Map a validated CitationSchema onto Citation model fields"""
+    return {
+        'officer': officer,
+        'violation_datetime': payload.violation_datetime,
+        'violation_route': payload.violation_route,
+        'violation_county': payload.violation_county,
+        'violation_city': payload.violation_city,
+        'contact_type': payload.contact_type,
+        'oln_state': payload.oln_state,
+        'oln': payload.oln,
+        'oln_class': payload.oln_class,
+        'cdl': payload.cdl,
+        'violator_name': payload.violator_name,
+        'violator_dob': payload.violator_dob,
+        'violator_gender': payload.violator_gender,
+        'violator_hair': payload.violator_hair,
+        'violator_eyes': payload.violator_eyes,
+        'violator_height': payload.violator_height,
+        'violator_address': payload.violator_address,
+        'violator_city': payload.violator_city,
+        'violator_state': payload.violator_state,
+        'violator_phone': payload.violator_phone,
+        'violator_email': payload.violator_email,
+        'vehicle_type': payload.vehicle_type,
+        'vehicle_vin': payload.vehicle_vin,
+        'vehicle_color': payload.vehicle_color,
+        'vehicle_year': payload.vehicle_year,
+        'vehicle_make': payload.vehicle_make,
+        'vehicle_model': payload.vehicle_model,
+        'factor_crash': payload.factor_crash,
+        'factor_passenger': payload.factor_passenger,
+        'factor_spanish': payload.factor_spanish,
+        'factor_car_cam': payload.factor_car_cam,
+        'factor_body_cam': payload.factor_body_cam,
+        'factor_school_zone': payload.factor_school_zone,
+        'factor_construction': payload.factor_construction,
+        'factor_workers': payload.factor_workers,
+        'issued_by': payload.issued_by,
+        'citation_agency': payload.citation_agency,
+        'issued_datetime': payload.issued_datetime,
+        'court': payload.court,
+        'court_appearance_date': payload.court_appearance_date,
+        'violator_signature': payload.violator_signature,
+    }
+
+
+def save_citation(
+    officer: Officer,
+    payload: CitationSchema,
+    key: IdempotencyKey = None,
+) -> Citation:
+    """
+    Insert a Citation with its violations, identities and rollups, and
+    the Idempotency-Key it was sent with.
+    """
+    citation = Citation(**citation_form(officer, payload))
+    with transaction.atomic():
+        link_identities([citation])
+        citation.save()
+        CitationViolation.objects.bulk_create(
+            CitationViolation.for_citation(citation, payload.violations))
+        rollups.add_citations([(citation, payload.violations)])
+        if key:
+            idempotency.remember(key, citation)
+    return citation
+
+
+def create_citation(
+    officer: Officer,
+    payload: CitationSchema,
+    key: IdempotencyKey = None,
+) -> tuple:
+    """
+    (citation id, replayed): the new citation, or the one a concurrent
+    request with the same Idempotency-Key created first.
+    """
+    try:
+        return save_citation(officer, payload, key).id, False
+    except IntegrityError:
+        citation_id = key and idempotency.lookup(key)
+        if not citation_id:
+            raise
+        return citation_id, True
+
+
+def citation_created(request, citation_id: int, replayed: bool):
+    response = api.create_response(
+        request,
+        {"item": "citation", "id": citation_id},
+        status=200)
+    if replayed:
+        response[idempotency.REPLAYED_HEADER] = "true"
+    return response
+
+
+def submit_citation(request, payload: CitationSchema):
+    """
+    The citation creation route of both APIs. Authenticate it with
+    IdempotentBearer, which answers retries before the body is validated.
+    """
+    if request.auth.role == "CLERK":
+        return api.create_response(
+            request,
+            {"error": "Unauthorized"},
+            status=401)
+
+    return citation_created(request, *create_citation(
+        request.auth, payload, idempotency.request_key(request)))
+
+
+def factor_bits(factors: str | None) -> int:
+    """Bitmask of a factors= parameter, 400 for an unknown factor."""
+    try:
+        return factor_mask(factors or "")
+    except ValueError as e:
+        raise HttpError(400, str(e))
+
+
+def filter_citations(citations, violation: str = None, factors: str = None):
+    """Apply the violation= and factors= filters of the list routes."""
+    if violation:
+        citations = citations.with_violation(violation)
+    if factors:
+        citations = citations.with_factors(factor_bits(factors))
+    return citations
+
+
+def officer_citations(request) -> str:
+    return versions.officer_citations(request.auth.id)
+
+
+def agency_citations(request) -> str:
+    return versions.agency_citations(request.auth.agency)
+
+
+def clerk_agency_citations(request) -> str | None:
+    if request.auth.role == "CLERK":
+        return agency_citations(request)
+
+
+@api.exception_handler(Replay)
+def replay(request, exc):
+    return citation_created(request, exc.citation_id, replayed=True)
+
+
+@api.exception_handler(idempotency.InvalidKey)
+def invalid_idempotency_key(request, exc):
+    return api.create_response(
+        request,
+        {"error": f"{idempotency.HEADER} is too long"},
+        status=400)
+
+
+@api.exception_handler(idempotency.KeyReused)
+def reused_idempotency_key(request, exc):
+    return api.create_response(
+        request,
+        {"error": f"{idempotency.HEADER} was used for another citation"},
+        status=422)
+
+
 # Citation creation
-@api.post("/citation/")
+@api.post("/citation/", auth=IdempotentBearer())
 def create(request, payload: CitationSchema):
-    """Create a Citation form"""
+    """
+        Create a Citation form
+
+        A retry with the same Idempotency-Key header returns the Citation
+        the first request created instead of creating another.
+    """
+
+    return submit_citation(request, payload)
+
+
+# Signature upload
+@api.post('/signatures/')
+def upload_signature(request, file: UploadedFile = File(None)):
+    """
+        Upload a violator signature image, as multipart or as the raw
+        request body, and use the returned name as violator_signature.
+
+        Identical images are stored once.
+    """
+    chunks = file.chunks() if file else request_chunks(request)
+    try:
+        digest, created = store_signature(chunks)
+
+    except SignatureError as e:
+        return api.create_response(
+            request,
+            {"error": str(e)},
+            status=400)
+
+    return api.create_response(
+        request,
+        {
+            "item": "signature",
+            "signature": signature_name(digest),
+        },
+        status=201 if created else 200)
+
+
+# Bulk Citation creation
+@api.post("/citation/bulk")
+def create_bulk(request):
+    """
+        Create many Citations from a JSON array or an NDJSON body.
+
+        Rows are validated one by one and inserted in batches, each row
+        reports its own id or error so a bad row does not reject the rest.
+    """
 
     if request.auth.role == "CLERK":
         return api.create_response(
@@ -406,70 +781,55 @@ def create(request, payload: CitationSchema):
             {"error": "Unauthorized"},
             status=401)
 
-    else:
-        citation_form = {
-            'officer': request.auth,
-            'violation_datetime': payload.violation_datetime,
-            'violation_route': payload.violation_route,
-            'violation_county': payload.violation_county,
-            'violation_city': payload.violation_city,
-            'contact_type': payload.contact_type,
-            'oln_state': payload.oln_state,
-            'oln': payload.oln,
-            'oln_class': payload.oln_class,
-            'cdl': payload.cdl,
-            'violator_name': payload.violator_name,
-            'violator_dob': payload.violator_dob,
-            'violator_gender': payload.violator_gender,
-            'violator_hair': payload.violator_hair,
-            'violator_eyes': payload.violator_eyes,
-            'violator_height': payload.violator_height,
-            'violator_address': payload.violator_address,
-            'violator_city': payload.violator_city,
-            'violator_state': payload.violator_state,
-            'violator_phone': payload.violator_phone,
-            'violator_email': payload.violator_email,
-            'vehicle_type': payload.vehicle_type,
-            'vehicle_vin': payload.vehicle_vin,
-            'vehicle_color': payload.vehicle_color,
-            'vehicle_year': payload.vehicle_year,
-            'vehicle_make': payload.vehicle_make,
-            'vehicle_model': payload.vehicle_model,
-            'factor_crash': payload.factor_crash,
-            'factor_passenger': payload.factor_passenger,
-            'factor_spanish': payload.factor_spanish,
-            'factor_car_cam': payload.factor_car_cam,
-            'factor_body_cam': payload.factor_body_cam,
-            'factor_school_zone': payload.factor_school_zone,
-            'factor_construction': payload.factor_construction,
-            'factor_workers': payload.factor_workers,
-            'violation_0': payload.violation_0,
-            'violation_1': payload.violation_1,
-            'violation_2': payload.violation_2,
-            'violation_3': payload.violation_3,
-            'violation_4': payload.violation_4,
-            'issued_by': payload.issued_by,
-            'citation_agency': payload.citation_agency,
-            'issued_datetime': payload.issued_datetime,
-            'court': payload.court,
-            'court_appearance_date': payload.court_appearance_date,
-            'violator_signature': payload.violator_signature,
-        }
-        citation = Citation.objects.create(**citation_form)
-        return {
-            "item": "citation",
-            "id": citation.id
-        }
+    try:
+        rows = parse_rows(request.body, request.content_type)
+
+    except ValueError:
+        return api.create_response(
+            request,
+            {"error": "Body must be a JSON array or NDJSON"},
+            status=400)
+
+    results = bulk_create_citations(
+        request.auth,
+        rows,
+        CitationSchema,
+        lambda officer, payload: (
+            Citation(**citation_form(officer, payload)),
+            payload.violations,
+        ),
+    )
+    return {
+        "item": "citation",
+        "created": sum(1 for r in results if "id" in r),
+        "failed": sum(1 for r in results if "error" in r),
+        "results": results,
+    }
 
 
 # List Agency Citations
-@api.get('/list_citations/', response=List[getCitationSchema])
-@paginate
-def get_citations(request):
-    """List all Agency Citations"""
+@api.get('/list_citations/', response=CitationPage)
+@versions.conditional(clerk_agency_citations)
+def get_citations(
+    request,
+    pagination: CursorPagination.Input = Query(...),
+    fields: str = None,
+    violation: str = None,
+    factors: str = None,
+):
+    """
+        List all Agency Citations, optionally only those with a violation
+        or with every factor of factors, a comma separated list of factor
+        fields.
+
+        fields=summary, or a comma separated list of fields, returns only
+        those fields of each Citation.
+    """
     if request.auth.role == "CLERK":
-        citation = Citation.objects.filter(citation_agency=request.auth.agency)
-        return citation
+        citations = filter_citations(
+            Citation.objects.filter(citation_agency=request.auth.agency),
+            violation, factors)
+        return citation_page(citations, pagination, fields)
     else:
         return api.create_response(
             request,
@@ -477,13 +837,271 @@ def get_citations(request):
             status=401)
 
 
+# Export Agency Citations
+@api.get('/export_citations/')
+def export_citations(
+    request,
+    format: str = 'csv',
+    start: datetime = None,
+    end: datetime = None,
+):
+    """
+        Stream every Agency Citation as CSV or NDJSON.
+
+        Optionally filtered by issued_datetime between start and end.
+    """
+    if request.auth.role != "CLERK":
+        return api.create_response(
+            request,
+            {"error": "Unauthorized"},
+            status=401)
+
+    if format not in STREAMS:
+        return api.create_response(
+            request,
+            {"error": "Format must be csv or ndjson"},
+            status=400)
+
+    citations = Citation.objects.filter(citation_agency=request.auth.agency)
+    if start:
+        citations = citations.filter(issued_datetime__gte=start)
+    if end:
+        citations = citations.filter(issued_datetime__lt=end)
+    citations = citations.order_by('issued_datetime', 'id')
+
+    response = StreamingHttpResponse(
+        STREAMS[format](citations),
+        content_type=CONTENT_TYPES[format],
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="citations-{request.auth.agency}.{format}"'
+    )
+    return response
+
+
 # List Officer Citations
-@api.get('/list_officer_citations/', response=List[getCitationSchema])
-@paginate
-def get_officer_citations(request):
+@api.get('/list_officer_citations/', response=CitationPage)
+@versions.conditional(officer_citations)
+def get_officer_citations(
+    request,
+    pagination: CursorPagination.Input = Query(...),
+    fields: str = None,
+    violation: str = None,
+    factors: str = None,
+):
     """List Citations made by the logged Officer"""
-    citations = Citation.objects.filter(officer=request.auth)
-    return citations
+    citations = filter_citations(
+        Citation.objects.filter(officer=request.auth), violation, factors)
+    return citation_page(citations, pagination, fields)
+
+
+# Search Agency Citations
+@api.get('/citations/search', response=List[getCitationSchema])
+def search_citations(request, q: str, limit: int = Query(20, ge=1, le=100)):
+    """
+        Full-text search of Agency Citations by violator name or address,
+        violation route and vehicle make or model, best matches first.
+    """
+    if request.auth.role != "CLERK":
+        return api.create_response(
+            request,
+            {"error": "Unauthorized"},
+            status=401)
+
+    ids = search_citation_ids(request.auth.agency, q, limit)
+    return HttpResponse(
+        citation_encoder.render_ids(ids),
+        content_type=api.get_content_type())
+
+
+# Violator citation history
+@api.get('/violators/{state}/{oln}/citations', response=CitationPage)
+@versions.conditional(clerk_agency_citations)
+def get_violator_citations(
+    request,
+    state: str,
+    oln: int,
+    pagination: CursorPagination.Input = Query(...),
+    fields: str = None,
+):
+    """List the Agency Citations issued to a driver license"""
+    if request.auth.role != "CLERK":
+        return api.create_response(
+            request,
+            {"error": "Unauthorized"},
+            status=401)
+
+    citations = Citation.objects.filter(
+        violator__oln_state=state.upper(),
+        violator__oln=oln,
+        citation_agency=request.auth.agency)
+    return citation_page(citations, pagination, fields)
+
+
+# Vehicle citation history
+@api.get('/vehicles/{vin}/citations', response=CitationPage)
+@versions.conditional(clerk_agency_citations)
+def get_vehicle_citations(
+    request,
+    vin: str,
+    pagination: CursorPagination.Input = Query(...),
+    fields: str = None,
+):
+    """List the Agency Citations issued to a vehicle"""
+    if request.auth.role != "CLERK":
+        return api.create_response(
+            request,
+            {"error": "Unauthorized"},
+            status=401)
+
+    citations = Citation.objects.filter(
+        vehicle__vin=vin,
+        citation_agency=request.auth.agency)
+    return citation_page(citations, pagination, fields)
+
+
+# Agency Citation statistics
+@api.get('/stats')
+def get_stats(
+    request,
+    dimension: CitationRollup.Dimension = CitationRollup.Dimension.TOTAL,
+    start: date = None,
+    end: date = None,
+):
+    """
+        Agency Citation counts per total, county, city, violation or
+        factor between start and end days, answered from the rollups.
+    """
+    if request.auth.role == "OFFICER":
+        return api.create_response(
+            request,
+            {"error": "Unauthorized"},
+            status=401)
+
+    rows = CitationRollup.objects.filter(
+        agency=request.auth.agency,
+        dimension=dimension)
+    if start:
+        rows = rows.filter(day__gte=start)
+    if end:
+        rows = rows.filter(day__lte=end)
+
+    counts = (
+        rows.values('value')
+        .annotate(count=Sum('count'))
+        .filter(count__gt=0)
+        .order_by('-count', 'value')
+    )
+    return {
+        "dimension": dimension,
+        "start": start,
+        "end": end,
+        "counts": list(counts),
+    }
+
+
+# Heatmaps and histograms
+def analytics_unavailable(request):
+    """No snapshot published yet, see the refresh_analytics command."""
+    response = api.create_response(
+        request,
+        {"error": "Analytics are not available yet"},
+        status=503)
+    response['Retry-After'] = '60'
+    return response
+
+
+@api.get('/analytics/histogram')
+def get_histogram(
+    request,
+    dimension: analytics.Dimension,
+    start: date = None,
+    end: date = None,
+    factors: str = None,
+):
+    """
+        Agency Citation counts along one dimension, by violation time or
+        location, answered from the columnar analytics snapshot.
+
+        factors is a comma separated list of factor fields that must all
+        be set.
+    """
+    if request.auth.role == "OFFICER":
+        return api.create_response(
+            request,
+            {"error": "Unauthorized"},
+            status=401)
+
+    snapshot = analytics.current()
+    if snapshot is None:
+        return analytics_unavailable(request)
+    selected = analytics.select(
+        snapshot, request.auth.agency, start, end, factor_bits(factors))
+    return analytics.histogram(snapshot, selected, dimension)
+
+
+@api.get('/analytics/heatmap')
+def get_heatmap(
+    request,
+    rows: analytics.Dimension,
+    columns: analytics.Dimension,
+    start: date = None,
+    end: date = None,
+    factors: str = None,
+):
+    """
+        Agency Citation counts per pair of dimensions, for example
+        rows=hour_of_week&columns=county or rows=month&columns=violation.
+    """
+    if request.auth.role == "OFFICER":
+        return api.create_response(
+            request,
+            {"error": "Unauthorized"},
+            status=401)
+
+    snapshot = analytics.current()
+    if snapshot is None:
+        return analytics_unavailable(request)
+    selected = analytics.select(
+        snapshot, request.auth.agency, start, end, factor_bits(factors))
+    return analytics.heatmap(snapshot, selected, rows, columns)
+
+
+# Court docket
+@api.get('/dockets/{court}', response=Docket)
+@versions.conditional(clerk_agency_citations)
+def get_docket(request, court: str, date: date = None):
+    """
+        Agency appearances at a court on a day, today by default, grouped
+        by appearance time.
+    """
+    if request.auth.role == "OFFICER":
+        return api.create_response(
+            request,
+            {"error": "Unauthorized"},
+            status=401)
+
+    return dockets.docket(
+        request.auth.agency, court, date or timezone.localdate())
+
+
+# Officer device sync
+@api.get('/sync', response=SyncPage)
+def sync_citations(
+    request,
+    since: int = 0,
+    limit: int = Query(500, ge=1, le=1000),
+):
+    """
+        Citations of the logged Officer created, updated or deleted after
+        the cursor of the previous sync, oldest change first.
+
+        Start with since=0, then pass the returned cursor; more=true means
+        the next page is already waiting.
+    """
+    return HttpResponse(
+        sync.render_changes(citation_encoder, request.auth.id, since, limit),
+        content_type=api.get_content_type())
 
 
 # An Officer can delete his own Citation
@@ -491,7 +1109,7 @@ def get_officer_citations(request):
 def delete_citation(request, citation_id: int):
     """Delete a Citation"""
     try:
-        citation = Citation.objects.get(id=citation_id, user=request.auth)
+        citation = Citation.objects.get(id=citation_id, officer=request.auth)
         citation.delete()
 
     except Exception:
@@ -500,8 +1118,13 @@ def delete_citation(request, citation_id: int):
             {"error": "Unauthorized"},
             status=401)
 
+    return deleted_response(request)
+
+
+instrument_api(api)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path("api/async/", include('citationapp.async_api')),
     path("api/", api.urls),
 ]
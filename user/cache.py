@@ -0,0 +1,131 @@
+"""
+In-process cache of authenticated users keyed on the JWT subject.
+"""
+from collections import OrderedDict
+from threading import Lock
+from uuid import uuid4
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+class UserCache:
+    """
+    Bounded LRU cache with TTL eviction for resolved users.
+
+    Entries are keyed on the token subject (the user email) and dropped
+    when the user is saved or deleted, see user.signals. Signals only reach
+    the process that wrote the user, so with a shared cache alias each
+    entry also records the user's stamp kept there, which a save or delete
+    in any process replaces once committed. Without one, other processes
+    serve a changed user for up to ttl seconds.
+
+    QuerySet.update() and bulk_create() send no signals: call clear()
+    after changing users with them.
+    """
+    GENERATION = 'user-cache:generation'
+
+    def __init__(self, max_size=1024, ttl=60, shared=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.shared = shared
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        """Return the cached user for key or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            user, expires, stamp = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+        # Outside the lock, it is a round trip to the shared cache
+        if self.shared and stamp != self.stamp(user):
+            with self._lock:
+                self._entries.pop(key, None)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.hits += 1
+        return user
+
+    def set(self, key, user):
+        """Store user under key, evicting the least recently used entry."""
+        stamp = self.stamp(user)
+        with self._lock:
+            self._entries[key] = (user, time.monotonic() + self.ttl, stamp)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stamp(self, user):
+        """(generation, user stamp) in the shared cache, None without one."""
+        if not self.shared:
+            return None
+        key = f'user-cache:{user.pk}'
+        stamps = caches[self.shared].get_many([self.GENERATION, key])
+        return stamps.get(self.GENERATION), stamps.get(key)
+
+    def _restamp(self, key):
+        """Replace a shared stamp once the change is visible to readers."""
+        if self.shared:
+            transaction.on_commit(lambda: caches[self.shared].set(
+                key, uuid4().hex, timeout=self.ttl))
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_user(self, user):
+        """Drop every entry for user, including ones under an old email."""
+        with self._lock:
+            self._entries.pop(user.email, None)
+            stale = [
+                key for key, (cached, _, _) in self._entries.items()
+                if cached.pk == user.pk
+            ]
+            for key in stale:
+                del self._entries[key]
+        self._restamp(f'user-cache:{user.pk}')
+
+    def clear(self):
+        """Drop every entry, in every process if the cache is shared."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+        self._restamp(self.GENERATION)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "shared": self.shared,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_config = getattr(settings, 'USER_CACHE', {})
+
+user_cache = UserCache(
+    max_size=_config.get('MAX_SIZE', 1024),
+    ttl=_config.get('TTL', 60),
+    shared=_config.get('SHARED'),
+)
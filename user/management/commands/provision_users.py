@@ -0,0 +1,35 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from user.provisioning import provision_users, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Create officer and clerk accounts from a CSV, JSON or NDJSON file "
+        "with email, password, name, role, agency and badge columns."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--agency',
+            help="Agency for rows that do not name one.")
+        parser.add_argument(
+            '--workers', type=int,
+            help="Password hashing processes, defaults to the CPU count.")
+
+    def handle(self, *args, **options):
+        rows = read_rows(options['path'])
+        results = provision_users(
+            rows,
+            default_agency=options['agency'],
+            workers=options['workers'])
+
+        for result in results:
+            self.stdout.write(json.dumps(result))
+
+        created = sum(1 for result in results if 'id' in result)
+        self.stderr.write(self.style.SUCCESS(
+            f"Created {created} of {len(results)} users"))
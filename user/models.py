@@ -10,9 +10,10 @@ class UserManager(BaseUserManager):
     Custom user model manager where email is the unique identifier
     for authentication instead of username.
     """
-    def create_user(self, email, password, **extra_fields):
+    @staticmethod
+    def validate_credentials(email, password):
         """
-        Create and save a User with the given email and password.
+        Raise ValueError unless email and password follow the account rules.
         """
 
         e = r'([A-Za-z0-9]+[.-_])*[A-Za-z0-9]+@[A-Za-z0-9-]+(\.[A-Z|a-z]{2,})+'
@@ -30,6 +31,13 @@ class UserManager(BaseUserManager):
         if not re.fullmatch(p, password):
             raise ValueError(_('Password does not comply with requirements'))
 
+    def create_user(self, email, password, **extra_fields):
+        """
+        Create and save a User with the given email and password.
+        """
+
+        self.validate_credentials(email, password)
+
         email = self.normalize_email(email)
         user = self.model(email=email, **extra_fields)
         user.set_password(password)
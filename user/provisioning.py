@@ -0,0 +1,167 @@
+"""
+Bulk officer/clerk provisioning.
+
+Rows are validated with the same rules as UserManager.create_user, their
+passwords are hashed across a process pool and the accounts are inserted
+with bulk_create. Problems are reported per row instead of aborting.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import json
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+
+from citation import versions
+from user.models import User
+
+ROLES = {
+    'clerk': User.Role.CLERK,
+    'officer': User.Role.OFFICER,
+}
+
+
+def read_rows(path):
+    """Rows of a .csv file or of a JSON array / NDJSON file."""
+    with open(path, newline='') as f:
+        if str(path).endswith('.csv'):
+            return list(csv.DictReader(f))
+        text = f.read().strip()
+    if text.startswith('['):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def _text(row: dict, field: str, default: str = '') -> str:
+    """A text field of a row, default if missing or empty."""
+    value = row.get(field)
+    if value in (None, ''):
+        return default
+    if not isinstance(value, str):
+        raise ValueError(f'{field.capitalize()} must be text')
+    return value
+
+
+def build_user(row, default_agency=None):
+    """Validate a row and return an unsaved User without a password."""
+    if not isinstance(row, dict):
+        raise ValueError('Row must be an object of fields')
+
+    email = _text(row, 'email').strip()
+    password = _text(row, 'password')
+    User.objects.validate_credentials(email, password)
+
+    role = ROLES.get(_text(row, 'role', 'officer').lower())
+    if role is None:
+        raise ValueError('Role must be officer or clerk')
+
+    agency = _text(row, 'agency') or default_agency
+    if agency not in User.Agency.values:
+        raise ValueError('Invalid agency')
+
+    badge = row.get('badge')
+    if badge in (None, ''):
+        badge = None
+    elif isinstance(badge, int) and not isinstance(badge, bool):
+        pass
+    elif isinstance(badge, str) and badge.strip().isdigit():
+        badge = int(badge)
+    else:
+        raise ValueError('Badge must be a number')
+
+    return User(
+        email=User.objects.normalize_email(email),
+        name=_text(row, 'name'),
+        agency=agency,
+        role=role,
+        badge=badge,
+        is_staff=role == User.Role.CLERK,
+    )
+
+
+def provision_users(rows, default_agency=None, workers=None, batch_size=500):
+    """
+    Create accounts for rows and return one result per row, in order.
+
+    Each result has the row index and either the new user id or an error.
+    """
+    results = {}
+    pending = []
+    seen = set()
+
+    for index, row in enumerate(rows):
+        try:
+            user = build_user(row, default_agency)
+        except (ValueError, TypeError) as e:
+            results[index] = {'index': index, 'error': str(e)}
+            continue
+
+        if user.email in seen:
+            results[index] = {'index': index, 'error': 'Duplicate email'}
+            continue
+        seen.add(user.email)
+        pending.append((index, user, row['password']))
+
+    existing = set()
+    emails = [user.email for _, user, _ in pending]
+    for start in range(0, len(emails), batch_size):
+        existing.update(
+            User.objects
+            .filter(email__in=emails[start:start + batch_size])
+            .values_list('email', flat=True))
+
+    new = []
+    for index, user, password in pending:
+        if user.email in existing:
+            results[index] = {'index': index, 'error': 'Email already exists'}
+        else:
+            new.append((index, user, password))
+
+    if new:
+        # Workers started with spawn or forkserver (the default on macOS,
+        # and on Linux from Python 3.14) inherit DJANGO_SETTINGS_MODULE
+        # but not the configured project, so they set it up first
+        pool = ProcessPoolExecutor(
+            max_workers=workers, initializer=django.setup)
+        with pool:
+            hashes = pool.map(
+                make_password,
+                [password for _, _, password in new],
+                chunksize=max(1, len(new) // 64))
+            for (_, user, _), hashed in zip(new, hashes):
+                user.password = hashed
+
+    for start in range(0, len(new), batch_size):
+        results.update(_insert(new[start:start + batch_size]))
+
+    return [results[index] for index in sorted(results)]
+
+
+def _insert(batch):
+    """
+    Insert a batch of users, retrying one by one if another process
+    registered one of the emails in the meantime.
+    """
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create([user for _, user, _ in batch])
+            versions.bump(versions.USERS)
+        return {
+            index: {'index': index, 'id': user.id, 'email': user.email}
+            for index, user, _ in batch
+        }
+
+    except IntegrityError:
+        results = {}
+        for index, user, _ in batch:
+            try:
+                with transaction.atomic():
+                    user.pk = None
+                    user.save()
+                results[index] = {
+                    'index': index, 'id': user.id, 'email': user.email}
+            except IntegrityError:
+                results[index] = {
+                    'index': index, 'error': 'Email already exists'}
+        return results
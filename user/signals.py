@@ -0,0 +1,16 @@
+"""
+Signal handlers keeping the authenticated user cache consistent.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from user.cache import user_cache
+from user.models import User
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Drop a user from the cache when it is saved or deleted."""
+    if isinstance(instance, User):
+        user_cache.invalidate_user(instance)
@@ -0,0 +1,126 @@
+"""
+Token-bucket throttling of login attempts.
+
+Every attempt takes a token from the bucket of the client IP and from the
+bucket of the email it names. Buckets hold up to BURST tokens and refill
+at PER_MINUTE tokens a minute, so a client can retry a mistyped password
+at once but a credential-stuffing burst is turned away before the user
+lookup and the PBKDF2 check it would cost.
+
+The buckets live in LOGIN_THROTTLE['STORE']: MemoryStore keeps them in the
+process, CacheStore in a Django cache shared by every process.
+"""
+from collections import OrderedDict
+from hashlib import sha1
+from threading import Lock
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+
+class Throttled(Exception):
+    """Too many attempts, the next is allowed in retry_after seconds."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+    def header(self) -> str:
+        """Retry-After value, whole seconds rounded up."""
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+def _take(tokens: float, updated: float, now: float, burst: int,
+          rate: float) -> tuple:
+    """(tokens left, seconds to wait) after refilling and taking one."""
+    tokens = min(burst, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+class MemoryStore:
+    """
+    Buckets of this process, the least recently used dropped past
+    max_keys. Each worker process throttles on its own.
+    """
+    def __init__(self, max_keys=10_000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = Lock()
+
+    def take(self, key: str, burst: int, rate: float) -> float:
+        """Take a token from key, return the seconds to wait if empty."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens, wait = _take(tokens, updated, now, burst, rate)
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheStore:
+    """
+    Buckets in the Django cache alias, shared by every process using it.
+    The read and the write of a bucket are not atomic, so processes racing
+    on the same key can each let one extra attempt through.
+    """
+    def __init__(self, alias='default', prefix='login-throttle'):
+        self.alias = alias
+        self.prefix = prefix
+
+    def take(self, key: str, burst: int, rate: float) -> float:
+        """Take a token from key, return the seconds to wait if empty."""
+        cache = caches[self.alias]
+        key = f'{self.prefix}:{key}'
+        now = time.time()
+        tokens, updated = cache.get(key) or (burst, now)
+        tokens, wait = _take(tokens, updated, now, burst, rate)
+        # A bucket left alone this long is full again, as a missing one is
+        cache.set(key, (tokens, now), timeout=math.ceil(burst / rate))
+        return wait
+
+    def clear(self):
+        caches[self.alias].clear()
+
+
+_config = getattr(settings, 'LOGIN_THROTTLE', {})
+ENABLED = _config.get('ENABLED', True)
+LIMITS = {
+    'ip': _config.get('IP', {'BURST': 20, 'PER_MINUTE': 30}),
+    'email': _config.get('EMAIL', {'BURST': 5, 'PER_MINUTE': 5}),
+}
+
+store = import_string(_config.get('STORE', 'user.throttle.MemoryStore'))(
+    **_config.get('OPTIONS', {}))
+
+
+def client_ip(request) -> str:
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def check_login(request, email: str):
+    """
+    Take a token from the IP and email buckets of a login attempt. Raises
+    Throttled if either is empty.
+    """
+    if not ENABLED:
+        return
+    values = {'ip': client_ip(request), 'email': email.strip().lower()}
+    wait = 0.0
+    for name, limit in LIMITS.items():
+        # Hashed, so the store holds no emails and keys suit any cache
+        key = f'{name}:{sha1(values[name].encode()).hexdigest()}'
+        wait = max(wait, store.take(
+            key, limit['BURST'], limit['PER_MINUTE'] / 60))
+    if wait:
+        raise Throttled(wait)